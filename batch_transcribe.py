@@ -0,0 +1,309 @@
+"""Offline transcription of a directory of recorded instructions (WAV/FLAC).
+
+Files stream through three stages so none of them waits on the others:
+
+1. a producer thread decodes each file (``faster_whisper.decode_audio``, 16 kHz
+   mono) and trims leading/trailing silence with the energy VAD from
+   ``parallel_stt``; a bounded queue keeps only a few decoded files in memory
+2. batches of ``--batch-size`` files go to a process pool of faster-whisper
+   workers (``stt_worker``: one model per worker, ``cores // workers`` threads each)
+3. the main thread appends one JSON line per file to the results file and
+   fsyncs it, so a crash loses at most the files still in flight
+
+Re-running with the same output file resumes: files already recorded (same path,
+size and mtime) are skipped. ``--commands`` also turns each transcript into a
+shell command with the live shell's Gemini pipeline, at low rate-limiter
+priority: it only uses the shared budget above the reserve kept for interactive
+sessions on the same key. That runs on its own thread, so the Gemini round trips
+never hold up collecting and submitting batches (files/sec and RTF only cover
+transcription). Commands are only generated and checked by the sanitizer, never
+executed.
+
+    python batch_transcribe.py recordings/ -o transcripts.jsonl --workers 2 --batch-size 4
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import parallel_stt
+import stt_tune
+import stt_worker
+
+SAMPLE_RATE = parallel_stt.SAMPLE_RATE
+AUDIO_EXTENSIONS = (".wav", ".flac")
+# Above 0, so rate_limiter.LLMRateLimiter keeps its reserve free for interactive turns
+BATCH_PRIORITY = 10
+
+
+def find_audio(root, recursive=False):
+    if os.path.isfile(root):
+        return [root]
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        paths += [os.path.join(dirpath, f) for f in filenames if f.lower().endswith(AUDIO_EXTENSIONS)]
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def file_key(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_done(results_path):
+    """Keys of files already finished in ``results_path`` (errors are retried)."""
+    done = set()
+    try:
+        with open(results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                if rec.get("status") in ("ok", "silent"):
+                    done.add((rec["path"], rec["size"], rec["mtime_ns"]))
+    except OSError:
+        pass
+    return done
+
+
+def trim_silence(audio, fs=SAMPLE_RATE, threshold=0.01, pad_ms=200, frame_ms=30):
+    """Cut leading/trailing frames below ``threshold`` RMS; returns (samples, speech seconds)."""
+    rms, frame = parallel_stt.frame_rms(audio, fs, frame_ms)
+    voiced = (rms >= threshold).nonzero()[0]
+    if not len(voiced):
+        return audio[:0], 0.0
+    pad = int(fs * pad_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(audio), (voiced[-1] + 1) * frame + pad)
+    return audio[start:end], (end - start) / float(fs)
+
+
+# ---- worker side (runs in stt_worker processes) ----
+def _transcribe_batch(items, language, beam_size):
+    model = stt_worker.get_model()
+    out = []
+    for key, samples in items:
+        start = time.perf_counter()
+        try:
+            segments, info = model.transcribe(samples, language=language, beam_size=beam_size)
+            text = " ".join(s.text.strip() for s in segments).strip()
+        except Exception as e:
+            out.append((key, {"status": "error", "error": f"{type(e).__name__}: {e}"}))
+            continue
+        out.append((key, {
+            "status": "ok",
+            "text": text,
+            "language": info.language,
+            "language_probability": round(info.language_probability, 3),
+            "transcribe_ms": round((time.perf_counter() - start) * 1000.0, 1),
+        }))
+    return out
+
+
+class BatchTranscriber:
+    def __init__(self, size="small", compute_type="int8", workers=2, cpu_threads=0, beam_size=5,
+                 batch_size=4, language=None, queue_size=8, vad_threshold=0.01):
+        self.size = size
+        self.compute_type = compute_type
+        self.workers = max(1, workers)
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 2) // self.workers)
+        self.beam_size = beam_size
+        self.batch_size = max(1, batch_size)
+        self.language = language
+        self.queue_size = queue_size
+        self.vad_threshold = vad_threshold
+
+    def _produce(self, paths, out_q, stop):
+        from faster_whisper import decode_audio
+
+        try:
+            for path in paths:
+                if stop.is_set():
+                    break
+                key = file_key(path)
+                start = time.perf_counter()
+                try:
+                    audio = decode_audio(path, sampling_rate=SAMPLE_RATE)
+                except Exception as e:
+                    out_q.put((key, None, {"status": "error", "error": f"decode: {type(e).__name__}: {e}"}))
+                    continue
+                trimmed, speech_s = trim_silence(audio, SAMPLE_RATE, self.vad_threshold)
+                meta = {
+                    "duration_s": round(len(audio) / float(SAMPLE_RATE), 3),
+                    "speech_s": round(speech_s, 3),
+                    "decode_ms": round((time.perf_counter() - start) * 1000.0, 1),
+                }
+                out_q.put((key, trimmed, meta))
+        finally:
+            out_q.put(None)
+
+    def run(self, paths, results_path, on_result=None):
+        """Transcribe ``paths`` into ``results_path`` (JSONL, resumable); returns a summary dict.
+
+        ``on_result(record)`` may add fields to each ``ok`` record before it is
+        written; it runs on a separate thread so it never stalls transcription.
+        """
+        done = load_done(results_path)
+        todo = [p for p in paths if tuple(file_key(p).values()) not in done]
+        summary = {"files": len(paths), "skipped": len(paths) - len(todo), "ok": 0, "silent": 0, "errors": 0,
+                   "audio_s": 0.0}
+        if not todo:
+            return dict(summary, wall_s=0.0, annotate_wait_s=0.0, files_per_s=None, rtf=None)
+
+        start = time.perf_counter()
+        decoded = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(todo, decoded, stop), name="decode", daemon=True)
+        metas = {}
+        pending = set()
+        batch = []
+
+        out_lock = threading.Lock()
+        annotator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="annotate") if on_result else None
+        transcribed = None
+
+        with open(results_path, "a", encoding="utf-8") as out, stt_worker.start_pool(
+            self.workers, self.size, self.compute_type, self.cpu_threads
+        ) as pool:
+
+            def append(rec):
+                with out_lock:
+                    summary[{"ok": "ok", "silent": "silent"}.get(rec["status"], "errors")] += 1
+                    summary["audio_s"] += rec.get("duration_s") or 0.0
+                    out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+
+            def annotate(rec):
+                try:
+                    on_result(rec)
+                except Exception as e:
+                    rec["annotate_error"] = f"{type(e).__name__}: {e}"
+                append(rec)
+
+            def write(key, rec):
+                rec = dict(key, **rec, ts=time.time())
+                if annotator is not None and rec["status"] == "ok":
+                    # Not on disk until annotated: a crash before that retries the file
+                    annotator.submit(annotate, rec)
+                else:
+                    append(rec)
+
+            def collect(return_when, timeout=None):
+                nonlocal pending
+                finished, pending = wait(pending, timeout=timeout, return_when=return_when)
+                for fut in finished:
+                    for key, rec in fut.result():
+                        write(key, dict(metas.pop(key["path"]), **rec))
+
+            def submit():
+                pending.add(pool.submit(_transcribe_batch, list(batch), self.language, self.beam_size))
+                batch.clear()
+                # Bound in-flight work so decoded audio does not pile up in memory
+                while len(pending) >= 2 * self.workers:
+                    collect(FIRST_COMPLETED)
+
+            producer.start()
+            try:
+                while True:
+                    try:
+                        item = decoded.get(timeout=0.2)
+                    except queue.Empty:
+                        item = False
+                    # Write whatever batches have finished meanwhile
+                    collect(FIRST_COMPLETED, timeout=0)
+                    if item is False:
+                        continue
+                    if item is None:
+                        break
+                    key, samples, meta = item
+                    if samples is None:
+                        write(key, meta)
+                    elif not len(samples):
+                        write(key, dict(meta, status="silent", text=""))
+                    else:
+                        metas[key["path"]] = meta
+                        batch.append((key, samples))
+                        if len(batch) >= self.batch_size:
+                            submit()
+                if batch:
+                    submit()
+                if pending:
+                    collect(ALL_COMPLETED)
+                transcribed = time.perf_counter()
+            finally:
+                stop.set()
+                if annotator is not None:
+                    annotator.shutdown(wait=True)
+
+        end = time.perf_counter()
+        wall = (transcribed or end) - start
+        processed = len(todo)
+        return dict(
+            summary,
+            audio_s=round(summary["audio_s"], 1),
+            wall_s=round(wall, 2),
+            annotate_wait_s=round(end - (transcribed or end), 2),
+            files_per_s=round(processed / wall, 2) if wall else None,
+            rtf=round(wall / summary["audio_s"], 3) if summary["audio_s"] else None,
+        )
+
+
+def _command_annotator():
+    """Lazily import the live shell and return an ``on_result`` that adds a command."""
+    import voice_shell_tunglish as core
+
+    def annotate(rec):
+        try:
+            instruction = core.normalize_instruction(rec["text"], priority=BATCH_PRIORITY)
+            command, exit_flag = core.get_command_and_exit(instruction, priority=BATCH_PRIORITY)
+        except Exception as e:
+            rec["command_error"] = str(e)
+            return
+        rec["instruction"] = instruction
+        rec["command"] = command
+        rec["exit_intent"] = exit_flag
+        rec["unsafe"] = bool(command) and not core.sanitize_command(command)
+
+    return annotate
+
+
+def main(argv=None):
+    profile = stt_tune.load_profile(os.environ.get("VOICE_SHELL_STT_PROFILE", "stt_profile.json").strip())
+    parser = argparse.ArgumentParser(description="Transcribe a directory of WAV/FLAC recordings to resumable JSONL.")
+    parser.add_argument("input", help="directory (or single file) of .wav/.flac recordings")
+    parser.add_argument("-o", "--output", default="transcripts.jsonl")
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=4, help="files per worker task")
+    parser.add_argument("--size", default=profile.get("model_size", "small"))
+    parser.add_argument("--compute-type", default=profile.get("compute_type", "int8"))
+    parser.add_argument("--cpu-threads", type=int, default=0, help="threads per worker (0 = cores / workers)")
+    parser.add_argument("--beam-size", type=int, default=profile.get("beam_size", 5))
+    parser.add_argument("--language", default=None, help="e.g. ta or en; default: detect per file")
+    parser.add_argument("--vad-threshold", type=float, default=0.01, help="RMS below this is treated as silence")
+    parser.add_argument("--commands", action="store_true", help="also generate (not run) a shell command per file")
+    args = parser.parse_args(argv)
+
+    paths = find_audio(args.input, args.recursive)
+    if not paths:
+        parser.error(f"no .wav/.flac files in {args.input}")
+    bt = BatchTranscriber(args.size, args.compute_type, args.workers, args.cpu_threads, args.beam_size,
+                          args.batch_size, args.language, vad_threshold=args.vad_threshold)
+    on_result = _command_annotator() if args.commands else None
+    print(f"{len(paths)} files → {args.output} ({args.size}/{args.compute_type}, {bt.workers} workers × "
+          f"{bt.cpu_threads} threads, batch {bt.batch_size})")
+    summary = bt.run(paths, args.output, on_result)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Optional cache of command output for read-only shell commands.
+
+Commands are classified from their parsed tokens (``classify``):
+- ``read_only``: every pipeline segment is a known side-effect-free program and
+  there is no output redirection, command or process substitution → cacheable
+- ``navigation``: ``cd`` / ``pushd`` / ``popd`` → not cached, invalidates nothing
+- ``mutating``: anything else, including unknown programs → clears the cache
+
+Entries are keyed by (command, cwd, backend), bounded by count, total bytes and
+TTL, and dropped early when the mtime of the cwd or of a path argument changes.
+"""
+import os
+import re
+import shlex
+import threading
+import time
+from collections import OrderedDict
+
+READ_ONLY_PROGRAMS = {
+    "ls", "ll", "dir", "pwd", "du", "df", "cat", "head", "tail", "wc", "stat", "file", "tree",
+    "whoami", "id", "hostname", "uname", "which", "type", "echo", "printf", "grep", "egrep",
+    "fgrep", "rg", "find", "sort", "uniq", "cut", "tr", "nl", "column", "basename", "dirname",
+    "realpath", "readlink", "md5sum", "sha1sum", "sha256sum", "diff", "cmp", "printenv", "lsblk",
+    "sed", "git",
+}
+# Read-only git subcommands; anything else (commit, checkout, pull, ...) mutates
+GIT_READ_ONLY = {"status", "log", "diff", "show", "branch", "remote", "ls-files", "rev-parse", "describe", "blame", "shortlog"}
+# Only read-only as listings: "git branch -a" lists, "git branch feature" creates
+GIT_LIST_ONLY = {"branch", "remote"}
+# Flags that turn an otherwise read-only program into a writer
+MUTATING_FLAGS = {
+    "find": {"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls"},
+    "sed": {"-i", "--in-place"},
+    "sort": {"-o", "--output"},
+    "git": {"-d", "-D", "-m", "-M", "--delete", "--move", "--output", "add", "remove", "rm", "rename", "set-url", "prune"},
+}
+# Only checked for "git branch": in log/diff the same letters (-u, -c) are read-only
+GIT_BRANCH_MUTATING_FLAGS = {
+    "-u", "--set-upstream-to", "--unset-upstream", "-c", "-C", "--copy", "-f", "--force", "--edit-description",
+}
+
+NAVIGATION_PROGRAMS = {"cd", "pushd", "popd"}
+SEPARATORS = {"|", "||", "&&", ";", "&", "|&"}
+
+
+def _is_mutating_flag(prog, arg, bad):
+    # "--output=file" / "--in-place=.bak" count like their bare forms
+    if arg in bad or arg.split("=", 1)[0] in bad:
+        return True
+    # Attached short forms: "sed -i.bak", "sort -oout.txt"
+    return (prog == "sed" and arg.startswith("-i")) or (prog == "sort" and arg.startswith("-o"))
+
+
+def _is_output_redirect(tok):
+    # ">", ">>", "&>", ">&" and the clobbering ">|"
+    return tok not in SEPARATORS and set(tok) <= {">", "&", "|"} and ">" in tok
+
+
+def _segments(command):
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    tokens = list(lexer)
+    segment = []
+    for tok in tokens:
+        if tok in SEPARATORS:
+            if segment:
+                yield segment
+            segment = []
+        else:
+            segment.append(tok)
+    if segment:
+        yield segment
+
+
+def classify(command):
+    """Return ``read_only``, ``navigation`` or ``mutating`` for a shell command."""
+    # Substitutions run arbitrary commands: "$(...)", backticks, "<(...)", ">(...)"
+    if "`" in command or "$(" in command or "<(" in command or ">(" in command:
+        return "mutating"
+    try:
+        segments = list(_segments(command))
+    except ValueError:
+        return "mutating"
+    if not segments:
+        return "mutating"
+    kinds = set()
+    for seg in segments:
+        # Output redirection writes a file, except "2>/dev/null" and fd dups like "2>&1"
+        for i, tok in enumerate(seg):
+            if tok and _is_output_redirect(tok):
+                target = seg[i + 1] if i + 1 < len(seg) else ""
+                if target != "/dev/null" and not (tok == ">&" and target.isdigit()):
+                    return "mutating"
+        # Leading VAR=value assignments don't change the program
+        words = [t for t in seg if not re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", t)]
+        if not words:
+            return "mutating"
+        prog = os.path.basename(words[0])
+        if prog in NAVIGATION_PROGRAMS:
+            kinds.add("navigation")
+            continue
+        if prog not in READ_ONLY_PROGRAMS:
+            return "mutating"
+        args = words[1:]
+        if prog == "git":
+            positional = [a for a in args if not a.startswith("-")]
+            sub = positional[0] if positional else ""
+            if sub not in GIT_READ_ONLY:
+                return "mutating"
+            if sub in GIT_LIST_ONLY and len(positional) > 1:
+                return "mutating"
+            if sub == "branch" and any(_is_mutating_flag(prog, a, GIT_BRANCH_MUTATING_FLAGS) for a in args):
+                return "mutating"
+        if prog == "uniq" and len([a for a in args if not a.startswith("-")]) > 1:
+            # "uniq in.txt out.txt" writes its second operand
+            return "mutating"
+        bad = MUTATING_FLAGS.get(prog)
+        if bad and any(_is_mutating_flag(prog, a, bad) for a in args):
+            return "mutating"
+        kinds.add("read_only")
+    # "cd x && ls" depends on directory state we don't key on, so don't cache it
+    return "navigation" if "navigation" in kinds else "read_only"
+
+
+def wsl_to_local_path(path):
+    """Map a WSL path to one this process can stat, or None if it lives only inside WSL."""
+    if os.name != "nt":
+        return path
+    m = re.match(r"^/mnt/([a-zA-Z])(/.*)?$", path)
+    if not m:
+        return None
+    rest = (m.group(2) or "/").replace("/", "\\")
+    return f"{m.group(1).upper()}:{rest}"
+
+
+def watch_paths(command, cwd):
+    """Paths whose mtime should invalidate a cached result: the cwd plus existing path args."""
+    paths = [cwd]
+    try:
+        for seg in _segments(command):
+            for arg in seg[1:]:
+                if arg.startswith("-") or arg in SEPARATORS:
+                    continue
+                paths.append(arg if arg.startswith("/") else f"{cwd.rstrip('/')}/{arg}")
+    except ValueError:
+        pass
+    return paths
+
+
+def _mtimes(paths):
+    snap = {}
+    for p in paths:
+        local = wsl_to_local_path(p)
+        if local is None:
+            continue
+        try:
+            snap[local] = os.stat(local).st_mtime_ns
+        except OSError:
+            continue
+    return snap
+
+
+def _changed(snap):
+    for local, mtime in snap.items():
+        try:
+            if os.stat(local).st_mtime_ns != mtime:
+                return True
+        except OSError:
+            return True
+    return False
+
+
+class CommandResultCache:
+    def __init__(self, max_entries=64, max_bytes=1_000_000, ttl=30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, command, cwd, backend):
+        """Return ``(result, age_seconds)`` for a fresh entry, or None."""
+        key = (command, cwd, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            created, result, size, snap = entry
+            if time.monotonic() - created > self.ttl or _changed(snap):
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result, time.monotonic() - created
+
+    def put(self, command, cwd, backend, result):
+        size = len(result.get("stdout", "")) + len(result.get("stderr", ""))
+        if size > self.max_bytes:
+            return
+        key = (command, cwd, backend)
+        snap = _mtimes(watch_paths(command, cwd))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), dict(result), size, snap)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def invalidate_all(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,211 @@
+"""Always-on microphone listener.
+
+One ``sd.InputStream`` stays open for the whole session. The audio callback runs a
+cheap first-stage detector (mean absolute level on a decimated frame) and only
+forwards frames once speech looks likely and a consumer is waiting in
+``next_utterance``, so an idle session does no Python work apart from that
+per-block check, and speech while the app is busy (STT, Gemini, running a command)
+is never queued up and executed afterwards. ``next_utterance`` then applies the
+same RMS/silence endpointing as ``record_voice`` and writes the WAV.
+
+Stats (``listener.stats()``): idle CPU % while waiting for speech, the latency from
+detected speech onset to the consumer picking it up (handoff), and from onset to
+the captured file being ready (includes the utterance itself and endpointing).
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from percentiles import percentile
+
+
+class ContinuousListener:
+    def __init__(
+        self,
+        fs=16000,
+        frame_ms=30,
+        threshold=0.01,
+        gate_ratio=0.5,
+        silence_ms=800,
+        preroll_ms=300,
+        tail_ms=200,
+        max_utterance_s=30,
+        on_speech_start=None,
+    ):
+        self.fs = fs
+        self.frame_ms = frame_ms
+        self.frame_samples = int(fs * (frame_ms / 1000.0))
+        self.threshold = threshold
+        # First stage is deliberately more permissive than the RMS VAD
+        self.gate = threshold * gate_ratio
+        self.silence_frames = max(1, int(silence_ms / frame_ms))
+        self.tail_frames = max(0, int(tail_ms / frame_ms))
+        self.max_frames = int(max_utterance_s * 1000 / frame_ms)
+        self.on_speech_start = on_speech_start
+        self._prebuffer = deque(maxlen=max(1, int(preroll_ms / frame_ms)))
+        # Bounded: one full utterance plus its pre-roll
+        self._frames = queue.Queue(maxsize=self.max_frames + self._prebuffer.maxlen + 1)
+        self._waiting = threading.Event()
+        self._armed = False
+        self._quiet = 0
+        # Set while the app itself is speaking so TTS is not captured as input
+        self.muted = False
+        self._stream = None
+        self._lock = threading.Lock()
+        self._idle_wall = 0.0
+        self._idle_cpu = 0.0
+        self._onset_latencies_ms = deque(maxlen=200)
+        self._handoff_latencies_ms = deque(maxlen=200)
+        self.false_triggers = 0
+        self.utterances = 0
+        self.dropped_frames = 0
+
+    # ---- stream lifecycle ----
+    def start(self):
+        import sounddevice as sd
+        with self._lock:
+            if self._stream is not None:
+                return
+            self._stream = sd.InputStream(
+                channels=1,
+                samplerate=self.fs,
+                dtype="int16",
+                blocksize=self.frame_samples,
+                callback=self._callback,
+            )
+            self._stream.start()
+
+    def stop(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.stop()
+                self._stream.close()
+                self._stream = None
+
+    # ---- stage 1: runs on the audio thread, keep it cheap ----
+    def _put(self, item):
+        try:
+            self._frames.put_nowait(item)
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def _callback(self, indata, frames, time_info, status):
+        if self.muted or not self._waiting.is_set():
+            if self._armed:
+                self._armed = False
+                self._put((None, None))
+            if self.muted:
+                self._prebuffer.clear()
+            else:
+                self._prebuffer.append(indata.copy())
+            return
+        level = np.abs(indata[::4, 0]).mean() / 32768.0
+        if not self._armed:
+            self._prebuffer.append(indata.copy())
+            if level >= self.gate:
+                self._armed = True
+                self._quiet = 0
+                onset = time.monotonic()
+                for frame in self._prebuffer:
+                    self._put((onset, frame))
+                self._prebuffer.clear()
+            return
+        self._put((None, indata.copy()))
+        if level < self.gate:
+            self._quiet += 1
+            if self._quiet >= self.silence_frames + self.tail_frames:
+                self._armed = False
+                self._put((None, None))
+        else:
+            self._quiet = 0
+
+    # ---- stage 2: full VAD + endpointing on the consumer thread ----
+    def next_utterance(self, filename="input.wav", timeout=None):
+        """Block until an utterance is captured and written to ``filename``.
+
+        Returns the number of samples written, or 0 on timeout. Only speech that
+        starts while this call is waiting is captured.
+        """
+        import wavio
+
+        self.start()
+        self._armed = False
+        self._drain()
+        self._prebuffer.clear()
+        self._waiting.set()
+        try:
+            return self._capture(filename, timeout, wavio)
+        finally:
+            self._waiting.clear()
+
+    def _drain(self):
+        while True:
+            try:
+                self._frames.get_nowait()
+            except queue.Empty:
+                return
+
+    def _capture(self, filename, timeout, wavio):
+        while True:
+            wall0, cpu0 = time.monotonic(), time.process_time()
+            try:
+                onset, frame = self._frames.get(timeout=timeout)
+            except queue.Empty:
+                self._add_idle(wall0, cpu0)
+                return 0
+            self._add_idle(wall0, cpu0)
+            if frame is None or onset is None:
+                # Tail of an utterance the previous call already endpointed
+                continue
+            self._handoff_latencies_ms.append((time.monotonic() - onset) * 1000.0)
+            if self.on_speech_start is not None:
+                self.on_speech_start()
+            collected = [frame]
+            started = False
+            silent = 0
+            while len(collected) < self.max_frames:
+                rms = np.sqrt(np.mean((frame.astype(np.float32) / 32768.0) ** 2) + 1e-12)
+                if rms >= self.threshold:
+                    started = True
+                    silent = 0
+                elif started:
+                    silent += 1
+                    if silent >= self.silence_frames + self.tail_frames:
+                        break
+                _, frame = self._frames.get()
+                if frame is None:
+                    break
+                collected.append(frame)
+            if not started:
+                # Stage 1 fired on noise that never reached the VAD threshold
+                self.false_triggers += 1
+                continue
+            if silent > self.tail_frames:
+                collected = collected[: len(collected) - (silent - self.tail_frames)]
+            recording = np.concatenate(collected, axis=0)
+            wavio.write(filename, recording, self.fs, sampwidth=2)
+            self._onset_latencies_ms.append((time.monotonic() - onset) * 1000.0)
+            self.utterances += 1
+            return len(recording)
+
+    def _add_idle(self, wall0, cpu0):
+        self._idle_wall += time.monotonic() - wall0
+        self._idle_cpu += time.process_time() - cpu0
+
+    def stats(self):
+        lat = list(self._onset_latencies_ms)
+        handoff = list(self._handoff_latencies_ms)
+        return {
+            "utterances": self.utterances,
+            "false_triggers": self.false_triggers,
+            "dropped_frames": self.dropped_frames,
+            "idle_seconds": round(self._idle_wall, 1),
+            "idle_cpu_pct": round(100.0 * self._idle_cpu / self._idle_wall, 2) if self._idle_wall else None,
+            "onset_to_handoff_ms_p50": percentile(handoff, 50),
+            "onset_to_handoff_ms_p95": percentile(handoff, 95),
+            "onset_to_capture_ms_p50": percentile(lat, 50),
+            "onset_to_capture_ms_p95": percentile(lat, 95),
+        }
@@ -153,7 +153,23 @@ def build_report() -> Document:
 
 
 if __name__ == "__main__":
-    document = build_report()
-    output_name = "Project_Report.docx"
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the project report, or a performance report from turn traces.")
+    parser.add_argument("--perf", nargs="*", metavar="TRACES",
+                        help="build a performance report from trace files/dirs/globs (default: traces/)")
+    parser.add_argument("--slow-ms", type=float, default=5000.0, help="response time counted as a slow turn")
+    parser.add_argument("-o", "--output", help="output .docx path")
+    args = parser.parse_args()
+
+    if args.perf is not None:
+        from perf_report import aggregate, build_perf_report
+
+        agg = aggregate(args.perf or ["traces"], slow_ms=args.slow_ms)
+        document = build_perf_report(agg)
+        output_name = args.output or "Performance_Report.docx"
+    else:
+        document = build_report()
+        output_name = args.output or "Project_Report.docx"
     document.save(output_name)
     print(f"Saved {output_name}")
@@ -0,0 +1,254 @@
+"""Persistent command history and voice macros (SQLite).
+
+Every executed turn is stored as (transcript, instruction, command, cwd, rc,
+duration_ms). ``parse_recall`` recognizes requests that only make sense with that
+history, so they resolve locally instead of going to Gemini:
+
+- "run that again", "repeat the last command"          → last command
+- "repeat the last command in the other folder"         → last command in the previous distinct cwd
+- "run the last git command"                            → newest command starting with "git"
+- "run list the files again"                            → fuzzy match on earlier instructions
+- "save that as deploy check" / "save the last 3 commands as deploy check"
+- "deploy check" / "run macro deploy check"             → the macro's commands
+- "list macros"
+
+Macros can also be managed from the command line:
+
+    python history_store.py macro add "deploy check" "git status" "npm test"
+    python history_store.py macro list
+    python history_store.py history --prefix git
+"""
+import difflib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    transcript TEXT,
+    instruction TEXT,
+    command TEXT NOT NULL,
+    cwd TEXT,
+    rc INTEGER,
+    duration_ms REAL,
+    mode TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_ts ON history (ts);
+CREATE INDEX IF NOT EXISTS idx_history_command ON history (command);
+CREATE TABLE IF NOT EXISTS macros (
+    name TEXT PRIMARY KEY,
+    commands TEXT NOT NULL,
+    created REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_FILLER = r"(?:please\s+|can you\s+|just\s+)?"
+AGAIN_RE = re.compile(
+    rf"^{_FILLER}(?:(?:run|do|execute)\s+(?:that|it|the last command|the previous command|the same)(?:\s+\w+)?\s+again"
+    r"|repeat(?:\s+(?:that|it|the last command|the previous command|last command))?"
+    r"|(?:same|that)\s+again|again|thirumba\s+(?:pannu|run\s+pannu|podu))"
+    r"(?P<other>\s+(?:in|on|for)\s+the\s+(?:other|previous|last)\s+(?:folder|directory|dir))?[.!?]*$"
+)
+PREFIX_RE = re.compile(rf"^{_FILLER}(?:run|repeat|redo)\s+the\s+(?:last|previous)\s+(?P<prefix>[\w.\-]+)\s+command(?:\s+again)?[.!?]*$")
+FUZZY_RE = re.compile(rf"^{_FILLER}(?:run|do)\s+(?P<query>.+?)\s+again[.!?]*$|^{_FILLER}repeat\s+(?P<query2>.+?)[.!?]*$")
+SAVE_RE = re.compile(
+    rf"^{_FILLER}(?:save|remember|store)\s+(?:that|it|this|the last command|the last (?P<count>\d+|two|three|four|five) commands)"
+    r"\s+as\s+(?:a\s+)?(?:macro\s+)?(?P<name>.+?)[.!?]*$"
+)
+LIST_MACROS_RE = re.compile(r"^(?:list|show)\s+(?:all\s+)?(?:the\s+)?(?:my\s+)?macros[.!?]*$")
+RUN_MACRO_RE = re.compile(rf"^{_FILLER}(?:run\s+)?macro\s+(?P<name>.+?)[.!?]*$")
+_NUMBERS = {"two": 2, "three": 3, "four": 4, "five": 5}
+
+
+def normalize_phrase(text):
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s.\-]", " ", text.lower())).strip(" .")
+
+
+def parse_recall(text):
+    """Return ``(action, arg)`` for history/macro requests, else None.
+
+    action is one of: again, again_other_dir, prefix, fuzzy, save_macro, list_macros, macro.
+    ``macro`` here only covers explicit "run macro X"; bare macro names are matched
+    against the store by ``HistoryStore.match_macro``.
+    """
+    t = normalize_phrase(text)
+    if not t or len(t.split()) > 12:
+        return None
+    m = SAVE_RE.match(t)
+    if m:
+        count = m.group("count")
+        count = int(_NUMBERS.get(count, count)) if count else 1
+        return "save_macro", (m.group("name").strip(), count)
+    if LIST_MACROS_RE.match(t):
+        return "list_macros", None
+    m = RUN_MACRO_RE.match(t)
+    if m:
+        return "macro", m.group("name").strip()
+    m = AGAIN_RE.match(t)
+    if m:
+        return ("again_other_dir" if m.group("other") else "again"), None
+    m = PREFIX_RE.match(t)
+    if m:
+        return "prefix", m.group("prefix")
+    m = FUZZY_RE.match(t)
+    if m:
+        return "fuzzy", (m.group("query") or m.group("query2")).strip()
+    return None
+
+
+class HistoryStore:
+    def __init__(self, path="history.db", fuzzy_window=500):
+        self.path = path
+        self.fuzzy_window = fuzzy_window
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        self.recalls = {}
+        self.lookup_ms = deque(maxlen=500)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    # ---- history ----
+    def record(self, command, transcript="", instruction="", cwd=None, rc=None, duration_ms=None, mode="voice"):
+        self._write(
+            "INSERT INTO history (ts, transcript, instruction, command, cwd, rc, duration_ms, mode) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), transcript, instruction, command, cwd, rc, duration_ms, mode),
+        )
+
+    def last(self, n=1, ok_only=False):
+        """Newest ``n`` history rows, newest first."""
+        where = "WHERE rc = 0" if ok_only else ""
+        return self._query(f"SELECT * FROM history {where} ORDER BY ts DESC, id DESC LIMIT ?", (n,))
+
+    def previous_cwd(self, current):
+        """Most recent cwd in history other than ``current``."""
+        rows = self._query(
+            "SELECT cwd FROM history WHERE cwd IS NOT NULL AND cwd != ? ORDER BY ts DESC, id DESC LIMIT 1", (current,)
+        )
+        return rows[0]["cwd"] if rows else None
+
+    def search_prefix(self, prefix, limit=10):
+        # Range scan on the command index (a LIKE 'x%' would not use it)
+        return self._query(
+            "SELECT * FROM history WHERE command >= ? AND command < ? ORDER BY ts DESC, id DESC LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit),
+        )
+
+    def search_fuzzy(self, text, limit=5, cutoff=0.6):
+        """Rows whose instruction/transcript is closest to ``text`` (difflib ratio ≥ ``cutoff``)."""
+        rows = self._query(
+            "SELECT * FROM history WHERE rc = 0 OR rc IS NULL ORDER BY ts DESC, id DESC LIMIT ?", (self.fuzzy_window,)
+        )
+        by_phrase = {}
+        for row in rows:
+            for phrase in (row["instruction"], row["transcript"]):
+                if phrase:
+                    by_phrase.setdefault(normalize_phrase(phrase), row)
+        matches = difflib.get_close_matches(normalize_phrase(text), list(by_phrase), n=limit, cutoff=cutoff)
+        return [by_phrase[m] for m in matches]
+
+    # ---- macros ----
+    def define_macro(self, name, commands):
+        self._write(
+            "INSERT OR REPLACE INTO macros (name, commands, created, uses) VALUES (?, ?, ?, 0)",
+            (normalize_phrase(name), json.dumps(list(commands)), time.time()),
+        )
+
+    def delete_macro(self, name):
+        return self._write("DELETE FROM macros WHERE name = ?", (normalize_phrase(name),)) > 0
+
+    def list_macros(self):
+        return [(r["name"], json.loads(r["commands"]), r["uses"]) for r in self._query("SELECT * FROM macros ORDER BY name")]
+
+    def get_macro(self, name):
+        rows = self._query("SELECT commands FROM macros WHERE name = ?", (normalize_phrase(name),))
+        if not rows:
+            return None
+        self._write("UPDATE macros SET uses = uses + 1 WHERE name = ?", (normalize_phrase(name),))
+        return json.loads(rows[0]["commands"])
+
+    def match_macro(self, text, cutoff=0.85):
+        """Macro name that ``text`` is (nearly) exactly, ignoring a leading "run"; else None."""
+        t = re.sub(r"^(?:please\s+)?(?:run|do|execute)\s+", "", normalize_phrase(text))
+        names = [r["name"] for r in self._query("SELECT name FROM macros")]
+        if t in names:
+            return t
+        close = difflib.get_close_matches(t, names, n=1, cutoff=cutoff)
+        return close[0] if close else None
+
+    # ---- stats ----
+    def note_recall(self, action, elapsed_ms):
+        self.recalls[action] = self.recalls.get(action, 0) + 1
+        self.lookup_ms.append(elapsed_ms)
+
+    def stats(self):
+        rows = self._query("SELECT COUNT(*) AS n FROM history")[0]["n"]
+        macros = self._query("SELECT COUNT(*) AS n FROM macros")[0]["n"]
+        lat = sorted(self.lookup_ms)
+        return {
+            "history_rows": rows,
+            "macros": macros,
+            "recalls": dict(self.recalls),
+            "lookup_ms_max": round(lat[-1], 2) if lat else None,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Inspect command history and manage voice macros.")
+    parser.add_argument("--db", default=os.environ.get("VOICE_SHELL_HISTORY_DB", "history.db"))
+    sub = parser.add_subparsers(dest="what", required=True)
+    hist = sub.add_parser("history", help="show recent commands")
+    hist.add_argument("-n", type=int, default=20)
+    hist.add_argument("--prefix", help="only commands starting with this")
+    hist.add_argument("--search", help="fuzzy match on what was said")
+    macro = sub.add_parser("macro", help="manage macros")
+    macro.add_argument("action", choices=["add", "list", "rm"])
+    macro.add_argument("name", nargs="?")
+    macro.add_argument("commands", nargs="*")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    if args.what == "history":
+        if args.prefix:
+            rows = store.search_prefix(args.prefix, args.n)
+        elif args.search:
+            rows = store.search_fuzzy(args.search, args.n)
+        else:
+            rows = store.last(args.n)
+        for r in rows:
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["ts"]))
+            print(f"{when}  rc={r['rc']!s:>4}  {r['cwd'] or '-'}  {r['command']}")
+    elif args.action == "list":
+        for name, commands, uses in store.list_macros():
+            print(f"{name} ({uses} uses): " + " && ".join(commands))
+    elif args.action == "add":
+        if not args.name or not args.commands:
+            parser.error("macro add needs a name and at least one command")
+        store.define_macro(args.name, args.commands)
+        print(f"Saved macro '{normalize_phrase(args.name)}' ({len(args.commands)} commands)")
+    else:
+        if not args.name:
+            parser.error("macro rm needs a name")
+        print("Removed." if store.delete_macro(args.name) else "No such macro.")
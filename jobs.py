@@ -0,0 +1,207 @@
+"""Background jobs for long-running commands.
+
+Commands that are requested in the background ("... in the background", a trailing
+``&``) or predicted to be long-running (builds, installs, archive extraction, large
+copies) are started detached from the voice loop and tracked here, like shell
+``&`` jobs. Each job keeps only the last ``log_lines`` lines of output.
+
+``parse_job_request`` recognizes voice requests about jobs ("job status",
+"show output of job 2", "cancel job 1") so they resolve without Gemini.
+"""
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+
+# Programs / patterns that usually outlast the foreground timeout
+LONG_RUNNING_PATTERNS = [
+    r"^\s*(make|cmake|ninja|mvn|gradle|cargo|go\s+build|dotnet\s+build)\b",
+    r"^\s*(npm|yarn|pnpm)\s+(install|ci|run\s+build|build)\b",
+    r"^\s*(pip3?|python3?\s+-m\s+pip)\s+install\b",
+    r"^\s*(sudo\s+)?(apt|apt-get|dnf|yum)\s+(install|upgrade|update)\b",
+    r"^\s*docker\s+(build|pull|compose)\b",
+    r"^\s*git\s+clone\b",
+    r"^\s*(wget|curl)\b.*\s(-O|-o|--output)\b",
+    r"^\s*tar\s+(-\w*x\w*|x\w*|--extract)\b",
+    r"^\s*(unzip|7z|gunzip|xz\s+-d)\b",
+    r"^\s*(rsync|scp)\b",
+    r"^\s*cp\s+(-\w*r\w*|--recursive)\b",
+    r"^\s*(find|du)\s+/\s*",
+    r"^\s*sleep\s+\d{2,}",
+]
+
+BACKGROUND_PHRASES = re.compile(r"\b(in the background|background la|as a (background )?job|run it in background)\b", re.IGNORECASE)
+
+
+def wants_background(command, instruction=""):
+    """Return (run_in_background, command) — strips a trailing '&' if present."""
+    stripped = command.rstrip()
+    if stripped.endswith("&") and not stripped.endswith("&&"):
+        return True, stripped[:-1].rstrip()
+    if instruction and BACKGROUND_PHRASES.search(instruction):
+        return True, command
+    return any(re.search(p, command) for p in LONG_RUNNING_PATTERNS), command
+
+
+# A job request must name a job explicitly ("job 2", "background jobs", "jobs"):
+# "stop the cron job" or "list all tasks in todo.txt" are shell instructions.
+JOB_ID_RE = re.compile(r"\b(?:job|task)\s*(?:number\s*)?#?(\d+)\b")
+BACKGROUND_JOB_RE = re.compile(r"\bbackground\s+(?:jobs?|tasks?)\b")
+JOB_CANCEL_RE = re.compile(r"\b(cancel|stop|kill|abort|terminate)\b")
+JOB_OUTPUT_RE = re.compile(r"\b(output|log|logs|tail)\b")
+JOB_STATUS_WORDS_RE = re.compile(r"\b(status|list|show|running|check)\b")
+# Phrases where "jobs" itself is the thing asked about
+JOB_STATUS_RE = re.compile(
+    r"^(?:(?:list|show|check)\s+)?(?:all\s+)?(?:the\s+|my\s+)?(?:background\s+)?jobs(?:\s+status)?$"
+    r"|^(?:background\s+)?jobs?\s+status$|^status\s+of\s+(?:all\s+)?(?:the\s+|my\s+)?(?:background\s+)?jobs$"
+    r"|^what(?:'s|\s+is)\s+running\s+in\s+the\s+background$"
+)
+
+
+def parse_job_request(text):
+    """Return ``(action, job_id or None)`` for job queries, else None.
+
+    action is one of: status, output, cancel. Cancel and output need a job number
+    or "background job"; without a number, cancel is answered with a question
+    rather than guessing which job to kill.
+    """
+    t = re.sub(r"[.!?]+$", "", text.lower().strip()).strip()
+    if len(t.split()) > 10:
+        return None
+    id_match = JOB_ID_RE.search(t)
+    job_id = int(id_match.group(1)) if id_match else None
+    if JOB_STATUS_RE.match(t):
+        return "status", job_id
+    if job_id is None and not BACKGROUND_JOB_RE.search(t):
+        return None
+    if JOB_CANCEL_RE.search(t):
+        return "cancel", job_id
+    if JOB_OUTPUT_RE.search(t):
+        return "output", job_id
+    if JOB_STATUS_WORDS_RE.search(t) or re.fullmatch(r"(?:the\s+)?(?:job|task)\s*(?:number\s*)?#?\d+", t):
+        return "status", job_id
+    # e.g. "run the build as a background job": a command, not a query
+    return None
+
+
+class Job:
+    def __init__(self, job_id, command, cwd, log_lines):
+        self.id = job_id
+        self.command = command
+        self.cwd = cwd
+        self.started = time.time()
+        self.finished = None
+        self.returncode = None
+        self.state = "running"
+        self.log = deque(maxlen=log_lines)
+        self.proc = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    def tail(self, n=20):
+        return "\n".join(list(self.log)[-n:])
+
+    def summary(self):
+        rc = "" if self.returncode is None else f" rc={self.returncode}"
+        return f"[{self.id}] {self.state}{rc} {self.elapsed:.0f}s  {self.command}"
+
+
+class JobManager:
+    def __init__(self, log_lines=200, max_finished=20, on_finish=None):
+        self.log_lines = log_lines
+        self.max_finished = max_finished
+        self.on_finish = on_finish
+        self._jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def start(self, args, command, cwd):
+        """Start ``args`` (the full wsl argv) as job for ``command``; returns the Job."""
+        proc = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            errors="replace",
+        )
+        with self._lock:
+            job = Job(self._next_id, command, cwd, self.log_lines)
+            job.proc = proc
+            self._next_id += 1
+            self._jobs[job.id] = job
+            self._prune()
+        threading.Thread(target=self._pump, args=(job,), name=f"job-{job.id}", daemon=True).start()
+        return job
+
+    def _pump(self, job):
+        for line in job.proc.stdout:
+            job.log.append(line.rstrip("\n"))
+        rc = job.proc.wait()
+        job.returncode = rc
+        job.finished = time.time()
+        if job.state == "running":
+            job.state = "done" if rc == 0 else "failed"
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception:
+                pass
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.state != "running"]
+        for job in sorted(finished, key=lambda j: j.id)[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id=None):
+        """Return job ``job_id``, or the most recent job when None."""
+        with self._lock:
+            if job_id is not None:
+                return self._jobs.get(job_id)
+            return self._jobs[max(self._jobs)] if self._jobs else None
+
+    def list(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.id)
+
+    def running(self):
+        return [j for j in self.list() if j.state == "running"]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.state != "running":
+            return None
+        job.state = "cancelled"
+        job.proc.terminate()
+        try:
+            job.proc.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            job.proc.kill()
+        return job
+
+    def handle_request(self, action, job_id=None):
+        """Answer a parsed voice request; returns (spoken_reply, detail_text)."""
+        if action == "cancel":
+            if job_id is None:
+                running = ", ".join(str(j.id) for j in self.running())
+                if not running:
+                    return "No running job to cancel.", ""
+                return "Which job? Say cancel job and its number.", f"Running jobs: {running}"
+            job = self.cancel(job_id)
+            if job is None:
+                return f"Job {job_id} is not running.", ""
+            return f"Cancelled job {job.id}.", job.summary()
+        if action == "output":
+            job = self.get(job_id)
+            if job is None:
+                return "There are no jobs.", ""
+            return f"Showing output of job {job.id}.", f"{job.summary()}\n{job.tail() or '<no output yet>'}"
+        jobs = self.list() if job_id is None else [j for j in [self.get(job_id)] if j]
+        if not jobs:
+            return "There are no jobs.", ""
+        running = sum(1 for j in jobs if j.state == "running")
+        return f"{running} running, {len(jobs) - running} finished.", "\n".join(j.summary() for j in jobs)
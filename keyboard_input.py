@@ -0,0 +1,102 @@
+"""Non-blocking line input from the console, read on a background thread.
+
+``KeyboardReader`` reads one key at a time (``msvcrt`` on Windows, ``termios``
+cbreak mode + ``select`` on POSIX) so the line being typed can be shown in the
+TUI while it is edited. Each completed line is passed to ``on_line(text)``.
+Backspace edits, Esc clears the line, Ctrl+C interrupts the main thread.
+"""
+import _thread
+import os
+import sys
+import threading
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import select
+    import termios
+    import tty
+
+
+class KeyboardReader:
+    def __init__(self, on_line, poll_s=0.05):
+        self.on_line = on_line
+        self.poll_s = poll_s
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._saved_tty = None
+
+    @property
+    def buffer(self):
+        with self._lock:
+            return "".join(self._buffer)
+
+    @staticmethod
+    def available():
+        return os.name == "nt" or sys.stdin.isatty()
+
+    def start(self):
+        if self._thread is not None or not self.available():
+            return False
+        if os.name != "nt":
+            fd = sys.stdin.fileno()
+            self._saved_tty = termios.tcgetattr(fd)
+            # cbreak: keys arrive immediately, no echo, Ctrl+C still raises SIGINT
+            tty.setcbreak(fd)
+        self._thread = threading.Thread(target=self._run, name="keyboard", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._saved_tty is not None:
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._saved_tty)
+            self._saved_tty = None
+
+    def _read_key(self):
+        if os.name == "nt":
+            if not msvcrt.kbhit():
+                self._stop.wait(self.poll_s)
+                return None
+            ch = msvcrt.getwch()
+            if ch in ("\x00", "\xe0"):
+                msvcrt.getwch()  # arrow/function key: drop the scan code
+                return None
+            return ch
+        ready, _, _ = select.select([sys.stdin], [], [], self.poll_s)
+        if not ready:
+            return None
+        ch = sys.stdin.read(1)
+        if ch == "\x1b" and select.select([sys.stdin], [], [], 0.01)[0]:
+            # Escape sequence (arrow/function key): swallow it
+            while select.select([sys.stdin], [], [], 0)[0]:
+                sys.stdin.read(1)
+            return None
+        return ch
+
+    def _run(self):
+        while not self._stop.is_set():
+            ch = self._read_key()
+            if ch is None:
+                continue
+            if ch == "\x03":
+                _thread.interrupt_main()
+            elif ch in ("\r", "\n"):
+                with self._lock:
+                    line, self._buffer = "".join(self._buffer).strip(), []
+                if line:
+                    self.on_line(line)
+            elif ch in ("\x08", "\x7f"):
+                with self._lock:
+                    if self._buffer:
+                        self._buffer.pop()
+            elif ch == "\x1b":
+                with self._lock:
+                    self._buffer = []
+            elif ch.isprintable():
+                with self._lock:
+                    self._buffer.append(ch)
@@ -0,0 +1,241 @@
+"""Local language/script detection in front of the Gemini translation step.
+
+``route_instruction(text, language_code)`` decides, without any network call, how a transcript
+should be normalized before command generation:
+- ``english``: Latin script with no Tunglish vocabulary → used as-is
+- ``local``:   Tunglish that the small shell lexicon below can rewrite to English
+- ``gemini``:  native Indic script, or Tunglish we cannot handle → tamil_to_tunglish
+
+``detector_stats`` counts routes so the skip rate is visible at runtime, and
+``python language_detect.py --eval language_samples.jsonl`` reports the error
+rate on a labelled set (lines of ``{"text": ..., "label": "english|tunglish|tamil"}``).
+"""
+import json
+import re
+import sys
+import threading
+
+# Indic script blocks; any of these means the text needs real translation.
+INDIC_RANGES = [
+    (0x0900, 0x097F),  # Devanagari
+    (0x0980, 0x09FF),  # Bengali
+    (0x0A00, 0x0A7F),  # Gurmukhi
+    (0x0A80, 0x0AFF),  # Gujarati
+    (0x0B00, 0x0B7F),  # Oriya
+    (0x0B80, 0x0BFF),  # Tamil
+    (0x0C00, 0x0C7F),  # Telugu
+    (0x0C80, 0x0CFF),  # Kannada
+    (0x0D00, 0x0D7F),  # Malayalam
+]
+
+# "do" markers that follow an English verb: "Sample folder create pannu"
+DO_MARKERS = {
+    "pannu", "pannunga", "pannungo", "panni", "pannidu", "pannidunga", "pannuda", "pannuga",
+    "pannanum", "sei", "seyyi", "seiyu",
+}
+
+# Tamil verbs with a direct English equivalent: "sample.py kaattu"
+TUNGLISH_VERBS = {
+    "kaattu": "show", "kattu": "show", "kaatu": "show", "kaatunga": "show", "kattunga": "show",
+    "thira": "open", "thirai": "open", "thirakku": "open", "thiranga": "open",
+    "azhi": "delete", "azhichidu": "delete", "azhinga": "delete",
+    "paaru": "check", "paru": "check", "paarunga": "check",
+    "po": "go", "poo": "go", "ponga": "go", "poi": "go",
+    "maathu": "change", "mathu": "change", "maathunga": "change",
+    "eduthudu": "remove", "thedu": "find", "theduu": "find", "thedunga": "find",
+    "ezhuthu": "write", "ezhudhu": "write",
+}
+
+# Case markers / postpositions: "Sample-la", "home ku"
+POSTPOSITIONS = {
+    "la": "in", "le": "in", "ulla": "inside", "kulla": "inside", "ulle": "inside",
+    "ku": "to", "kku": "to", "oda": "of", "yoda": "of",
+    "lendhu": "from", "lerundhu": "from", "irundhu": "from", "lirundhu": "from",
+}
+
+OTHER_WORDS = {
+    "ella": "all", "ellam": "all", "ellaam": "all", "ellathaiyum": "all",
+    "inga": "here", "inge": "here", "ingey": "here", "anga": "there",
+    "puthu": "new", "pudhu": "new", "puthiya": "new", "pudhiya": "new",
+    "peru": "named", "per": "named", "perla": "named",
+    "mattum": "only", "muthal": "first", "kadaisi": "last", "varigal": "lines", "vari": "lines",
+}
+
+# Fillers that carry no meaning for command generation
+FILLERS = {"konjam", "da", "di", "ah", "aa", "nu", "um", "thaan", "dhaan", "please", "plz"}
+
+# Tamil words we recognize but do not translate locally; seeing one means "ask Gemini"
+UNHANDLED_TUNGLISH = {
+    "enna", "ennaa", "epdi", "eppadi", "yen", "enga", "engey", "irukku", "iruku", "illa", "illai",
+    "venum", "vendam", "sollu", "solunga", "mudiyuma", "aprom", "appuram", "apram", "athu", "adhu",
+    "ithu", "idhu", "naan", "nee", "namma", "enakku", "unakku", "romba", "seri", "sari",
+}
+
+TUNGLISH_LEXICON = set(DO_MARKERS) | set(TUNGLISH_VERBS) | set(POSTPOSITIONS) | set(OTHER_WORDS) | UNHANDLED_TUNGLISH
+
+_TOKEN_RE = re.compile(r"\S+")
+
+
+def has_indic_script(text):
+    return any(lo <= ord(ch) <= hi for ch in text for lo, hi in INDIC_RANGES)
+
+
+def _tokens(text):
+    out = []
+    for tok in _TOKEN_RE.findall(text):
+        tok = tok.strip(",!?\"'")
+        if not tok:
+            continue
+        # "folder-la" / "sample.py-ah" → split off the Tamil case marker
+        head, sep, tail = tok.rpartition("-")
+        if sep and head and tail.lower() in TUNGLISH_LEXICON | FILLERS:
+            out.extend([head, tail])
+        else:
+            out.append(tok)
+    return out
+
+
+def _is_tunglish(tok):
+    return tok.lower().rstrip(".") in TUNGLISH_LEXICON
+
+
+def detect(text):
+    """Return ``(label, tunglish_hits)`` with label in english/tunglish/native."""
+    if has_indic_script(text):
+        return "native", 0
+    hits = sum(1 for tok in _tokens(text) if _is_tunglish(tok))
+    return ("tunglish" if hits else "english"), hits
+
+
+def transliterate_tunglish(text):
+    """Rewrite common Tunglish shell phrasing to English, or return None if unsure.
+
+    Tamil is verb-final, so "<object> <verb> pannu" / "<object> <tamil verb>" is
+    turned around to "<verb> <object>", and trailing case markers become English
+    prepositions ("Sample-la file create pannu" → "create file in Sample").
+    """
+    toks = [t for t in _tokens(text) if t.lower() not in FILLERS]
+    if not toks:
+        return None
+    low = [t.lower().rstrip(".") for t in toks]
+    if low[-1] in DO_MARKERS and len(toks) >= 2:
+        verb, rest = toks[-2], toks[:-2]
+        if _is_tunglish(verb):
+            mapped = TUNGLISH_VERBS.get(verb.lower())
+            if mapped is None:
+                return None
+            verb = mapped
+    elif low[-1] in TUNGLISH_VERBS:
+        verb, rest = TUNGLISH_VERBS[low[-1]], toks[:-1]
+    else:
+        return None
+
+    # Split the object on postpositions: "X la Y" → "Y in X", trailing "X ku" → "to X"
+    phrase = []
+    pending = []
+    for tok in rest:
+        key = tok.lower()
+        if key in POSTPOSITIONS:
+            if not pending:
+                return None
+            phrase.append((POSTPOSITIONS[key], pending))
+            pending = []
+        elif key in OTHER_WORDS:
+            pending.append(OTHER_WORDS[key])
+        elif _is_tunglish(tok):
+            return None
+        else:
+            pending.append(tok)
+    words = [verb]
+    words.extend(pending)
+    for prep, obj in reversed(phrase):
+        words.append(prep)
+        words.extend(obj)
+    return " ".join(words).strip()
+
+
+class DetectorStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {"english": 0, "local": 0, "gemini": 0}
+
+    def record(self, route):
+        with self._lock:
+            self.routes[route] = self.routes.get(route, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            total = sum(self.routes.values())
+            skipped = self.routes.get("english", 0) + self.routes.get("local", 0)
+            return {
+                "routes": dict(self.routes),
+                "translation_skip_rate": (skipped / total) if total else 0.0,
+            }
+
+
+detector_stats = DetectorStats()
+
+
+def route_instruction(text, language_code=None):
+    """Return ``(route, normalized_text)``; normalized_text is None for the gemini route.
+
+    ``language_code`` is the language the STT was told to expect (e.g. ``en-IN``);
+    an English one skips detection entirely.
+    """
+    if language_code and language_code.lower().split("-")[0] == "en":
+        label = "english"
+    else:
+        label, _ = detect(text)
+    if label == "native":
+        route, normalized = "gemini", None
+    elif label == "english":
+        route, normalized = "english", text.strip()
+    else:
+        normalized = transliterate_tunglish(text)
+        route = "local" if normalized else "gemini"
+    detector_stats.record(route)
+    return route, normalized
+
+
+def evaluate(samples):
+    """Score the detector on ``(text, label)`` pairs; label is english/tunglish/tamil."""
+    total = errors = wrong_skips = skipped = 0
+    for text, label in samples:
+        total += 1
+        route, _ = route_instruction(text)
+        predicted_english = route == "english"
+        if route != "gemini":
+            skipped += 1
+        if predicted_english != (label == "english"):
+            errors += 1
+            if predicted_english:
+                # Tamil/Tunglish sent to command generation untranslated
+                wrong_skips += 1
+    return {
+        "samples": total,
+        "error_rate": errors / total if total else 0.0,
+        "wrong_skip_rate": wrong_skips / total if total else 0.0,
+        "translation_skip_rate": skipped / total if total else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate the local language detector on a labelled JSONL set.")
+    parser.add_argument("--eval", required=True, metavar="JSONL")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print each misclassified sample")
+    args = parser.parse_args()
+
+    pairs = []
+    with open(args.eval, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                pairs.append((row["text"], row["label"]))
+    if args.verbose:
+        for text, label in pairs:
+            route, normalized = route_instruction(text)
+            if (route == "english") != (label == "english"):
+                print(f"[{label} → {route}] {text}", file=sys.stderr)
+    print(json.dumps(evaluate(pairs), indent=2))
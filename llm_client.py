@@ -0,0 +1,296 @@
+"""Resilient client layer for the Gemini text models.
+
+Every LLM call in the shell goes through ``LLMClient.generate_text`` which adds:
+- a per-call deadline (no call can hang the voice loop)
+- jittered exponential-backoff retries for transient errors
+- a hedged request to a faster fallback model when the primary is slow
+- a circuit breaker that fails fast while the provider is unhealthy
+- latency / error metrics (``client.metrics.snapshot()``)
+- optional client-side rate limiting (``rate_limiter.LLMRateLimiter``) with
+  priorities, and coalescing of identical in-flight prompts
+
+The transport is a plain callable ``generate(model_name, prompt, timeout) -> str``
+so the client can be pointed at Gemini (``make_gemini_generate``) or at any fake.
+"""
+import random
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from percentiles import percentile
+from rate_limiter import InFlightCoalescer, estimate_tokens
+
+# Error class names (google.api_core / requests / httpx) that are worth retrying.
+RETRYABLE_ERROR_NAMES = {
+    "DeadlineExceeded", "ServiceUnavailable", "InternalServerError", "TooManyRequests",
+    "ResourceExhausted", "Aborted", "Unavailable", "GatewayTimeout", "BadGateway",
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout", "RemoteDisconnected",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def is_quota_error(exc):
+    return any(cls.__name__ in ("ResourceExhausted", "TooManyRequests") for cls in type(exc).__mro__) or "429" in str(exc)
+
+
+def is_retryable(exc):
+    if isinstance(exc, (TimeoutError, socket.timeout, socket.gaierror, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+class CircuitBreaker:
+    """Classic closed → open → half-open breaker keyed on consecutive failures."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a half-open trial without judging the provider (e.g. the request itself was bad)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+class LLMMetrics:
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=window)
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.breaker_rejections = 0
+        self.errors = {}
+
+    def record_call(self, latency_ms, ok, error=None):
+        with self._lock:
+            self.calls += 1
+            self._latencies_ms.append(latency_ms)
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+                name = type(error).__name__ if error is not None else "Unknown"
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def incr(self, field, n=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def snapshot(self):
+        with self._lock:
+            lat = sorted(self._latencies_ms)
+            return {
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "error_rate": (self.failures / self.calls) if self.calls else 0.0,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "breaker_rejections": self.breaker_rejections,
+                "errors": dict(self.errors),
+                "latency_ms_p50": percentile(lat, 50),
+                "latency_ms_p95": percentile(lat, 95),
+                "latency_ms_max": lat[-1] if lat else None,
+            }
+
+
+class LLMClient:
+    def __init__(
+        self,
+        generate,
+        primary_model,
+        fallback_model=None,
+        timeout=20.0,
+        max_attempts=3,
+        backoff_base=0.5,
+        backoff_max=4.0,
+        hedge_delay=2.5,
+        breaker=None,
+        max_workers=4,
+        limiter=None,
+    ):
+        self._generate = generate
+        self.primary_model = primary_model
+        self.fallback_model = fallback_model or None
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = LLMMetrics()
+        self.limiter = limiter
+        self.coalescer = InFlightCoalescer()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    def generate_text(self, prompt, timeout=None, priority=0):
+        """Return the model's text for ``prompt`` within ``timeout`` seconds (overall).
+
+        Identical prompts already in flight at the same ``priority`` share one
+        upstream call (so an interactive turn never waits in a batch call's queue
+        slot). ``priority`` orders callers waiting on the rate limiter (lower is
+        served first).
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = time.monotonic() + timeout
+        return self.coalescer.run(
+            (self.primary_model, priority, prompt),
+            lambda: self._generate_with_retries(prompt, deadline, priority),
+            timeout=timeout,
+        )
+
+    def _generate_with_retries(self, prompt, deadline, priority):
+        last_error = None
+        tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Fail fast before taking budget: a rejected call must not use up a token
+            if not self.breaker.allow():
+                self.metrics.incr("breaker_rejections")
+                raise CircuitOpenError("LLM provider is temporarily unavailable (circuit open); try again shortly.") from last_error
+            if self.limiter is not None:
+                try:
+                    self.limiter.acquire(tokens, priority=priority, timeout=remaining)
+                except TimeoutError:
+                    # No call was made, so a half-open trial must not stay claimed
+                    self.breaker.release()
+                    raise
+            if attempt:
+                self.metrics.incr("retries")
+            start = time.monotonic()
+            try:
+                text = self._hedged_call(prompt, deadline, tokens, priority)
+            except Exception as e:
+                self.metrics.record_call((time.monotonic() - start) * 1000.0, False, e)
+                last_error = e
+                if self.limiter is not None and is_quota_error(e):
+                    # Everyone sharing the key backs off, not just this caller
+                    self.limiter.pause(self.backoff_max)
+                if not is_retryable(e):
+                    # A rejected request (bad prompt, invalid argument) says nothing
+                    # about the provider's health, so it must not open the breaker
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                # Full jitter keeps several shells from retrying in lock-step
+                sleep_for = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                sleep_for = min(sleep_for, max(0.0, deadline - time.monotonic()))
+                if sleep_for:
+                    time.sleep(sleep_for)
+                continue
+            self.metrics.record_call((time.monotonic() - start) * 1000.0, True)
+            self.breaker.record_success()
+            return text
+        if last_error is None:
+            last_error = TimeoutError("LLM deadline exceeded")
+        raise last_error
+
+    def _hedged_call(self, prompt, deadline, tokens, priority=0):
+        remaining = deadline - time.monotonic()
+        primary = self._pool.submit(self._generate, self.primary_model, prompt, remaining)
+        futures = {primary: "primary"}
+        hedge_wait = remaining if self.fallback_model is None else min(self.hedge_delay, remaining)
+        done, _ = wait([primary], timeout=hedge_wait)
+        if not done and self.fallback_model is not None:
+            remaining = deadline - time.monotonic()
+            # A hedge is an extra upstream request: only send it if the budget allows now
+            if remaining > 0 and (self.limiter is None or self.limiter.try_acquire(tokens, priority)):
+                self.metrics.incr("hedges")
+                futures[self._pool.submit(self._generate, self.fallback_model, prompt, remaining)] = "fallback"
+        pending = set(futures)
+        first_error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                err = fut.exception()
+                if err is None:
+                    if futures[fut] == "fallback":
+                        self.metrics.incr("hedge_wins")
+                    return fut.result()
+                first_error = first_error or err
+        if first_error is not None and not pending:
+            raise first_error
+        raise TimeoutError(f"LLM call exceeded its deadline (model={self.primary_model})")
+
+
+def make_gemini_generate(genai_module):
+    """Adapt ``google.generativeai`` to the ``generate(model, prompt, timeout)`` transport.
+
+    ``generate.ping(model_name)`` sends a ``count_tokens`` request through the same
+    ``GenerativeModel`` (and so the same service client and channel) that
+    ``generate`` uses, which keeps the request path warm.
+    """
+    models = {}
+    lock = threading.Lock()
+
+    def get_model(model_name):
+        with lock:
+            model = models.get(model_name)
+            if model is None:
+                model = models[model_name] = genai_module.GenerativeModel(model_name)
+            return model
+
+    def generate(model_name, prompt, timeout):
+        response = get_model(model_name).generate_content(prompt, request_options={"timeout": max(1.0, timeout)})
+        return response.text.strip()
+
+    def ping(model_name, timeout=10.0):
+        get_model(model_name).count_tokens("ping", request_options={"timeout": timeout})
+
+    generate.ping = ping
+    return generate
@@ -0,0 +1,151 @@
+"""Connection warm-up and keep-alive for the Sarvam and Gemini clients.
+
+- ``install_dns_cache`` memoizes ``socket.getaddrinfo`` for a TTL and serves the
+  last good answer when a lookup fails with ``socket.gaierror``.
+- ``probe`` times DNS, TCP connect and TLS handshake separately for a host, on a
+  throwaway socket: these are standalone handshake timings, not the clients' own
+  connections (gRPC clients, for one, resolve and connect on their own).
+- ``ConnectionWarmer`` runs the probes and client warm-up callables in the
+  background at startup, then pings every ``interval`` seconds while the session
+  is active (``touch()`` marks activity) so pooled connections stay open.
+"""
+import socket
+import ssl
+import threading
+import time
+
+_dns_lock = threading.Lock()
+_dns_cache = {}
+_dns_stats = {"hits": 0, "misses": 0, "stale_served": 0}
+_orig_getaddrinfo = socket.getaddrinfo
+
+
+def install_dns_cache(ttl=300.0):
+    """Patch ``socket.getaddrinfo`` process-wide with a TTL cache (idempotent)."""
+
+    def cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with _dns_lock:
+            entry = _dns_cache.get(key)
+            if entry is not None and now - entry[0] < ttl:
+                _dns_stats["hits"] += 1
+                return entry[1]
+            _dns_stats["misses"] += 1
+        try:
+            result = _orig_getaddrinfo(host, port, family, type, proto, flags)
+        except socket.gaierror:
+            if entry is not None:
+                # Transient resolver failure: the last good answer is better than an error
+                with _dns_lock:
+                    _dns_stats["stale_served"] += 1
+                return entry[1]
+            raise
+        with _dns_lock:
+            _dns_cache[key] = (now, result)
+        return result
+
+    socket.getaddrinfo = cached_getaddrinfo
+
+
+def dns_cache_stats():
+    with _dns_lock:
+        return dict(_dns_stats, entries=len(_dns_cache))
+
+
+def probe(host, port=443, timeout=5.0, ssl_context=None):
+    """Return handshake timings in ms: ``{"dns_ms", "tcp_ms", "tls_ms"}``."""
+    t0 = time.perf_counter()
+    family, socktype, proto, _, addr = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    t1 = time.perf_counter()
+    sock = socket.socket(family, socktype, proto)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(addr)
+        t2 = time.perf_counter()
+        ctx = ssl_context or ssl.create_default_context()
+        with ctx.wrap_socket(sock, server_hostname=host):
+            t3 = time.perf_counter()
+    finally:
+        sock.close()
+    return {
+        "dns_ms": round((t1 - t0) * 1000.0, 1),
+        "tcp_ms": round((t2 - t1) * 1000.0, 1),
+        "tls_ms": round((t3 - t2) * 1000.0, 1),
+    }
+
+
+class ConnectionWarmer:
+    def __init__(self, interval=45.0, active_window=300.0, ssl_context=None):
+        self.interval = interval
+        self.active_window = active_window
+        self.ssl_context = ssl_context
+        self._hosts = []
+        self._warmups = []
+        self._pings = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_activity = time.monotonic()
+        self.handshakes = {}
+        self.requests = {}
+        self.failures = {}
+
+    def add_host(self, host, port=443):
+        self._hosts.append((host, port))
+
+    def add_warmup(self, name, fn):
+        """``fn()`` runs once at startup (e.g. construct a client)."""
+        self._warmups.append((name, fn))
+
+    def add_ping(self, name, fn):
+        """``fn()`` is a cheap request reusing the client's pooled connection."""
+        self._pings.append((name, fn))
+
+    def touch(self):
+        self._last_activity = time.monotonic()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="net-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        for host, port in self._hosts:
+            self._timed(self.handshakes, host, lambda: probe(host, port, ssl_context=self.ssl_context))
+        for name, fn in self._warmups:
+            self._timed(self.requests, f"{name}:warmup", fn)
+        self._ping_all()
+        while not self._stop.wait(self.interval):
+            if time.monotonic() - self._last_activity <= self.active_window:
+                self._ping_all()
+
+    def _ping_all(self):
+        for name, fn in self._pings:
+            self._timed(self.requests, name, fn)
+
+    def _timed(self, bucket, name, fn):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            with self._lock:
+                self.failures[name] = f"{type(e).__name__}: {e}"
+            return
+        elapsed = round((time.perf_counter() - start) * 1000.0, 1)
+        with self._lock:
+            bucket[name] = result if isinstance(result, dict) else {"last_ms": elapsed}
+            self.failures.pop(name, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "standalone_handshake": dict(self.handshakes),
+                "request": dict(self.requests),
+                "failures": dict(self.failures),
+                "dns_cache": dns_cache_stats(),
+            }
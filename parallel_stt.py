@@ -0,0 +1,211 @@
+"""Parallel chunked transcription of long dictations.
+
+Long recordings are split at internal pauses (frame RMS computed with numpy over
+the whole signal at once) and the chunks are decoded concurrently by a process
+pool of faster-whisper workers, each with its own model and ``cpu_threads``
+(started from the slim ``stt_worker`` entry module). Results are stitched back
+together in chunk order. Unless a language is given, it is detected on the first
+chunk and then used for all the others, so chunks never disagree.
+
+Benchmark how the speedup scales with cores:
+
+    python parallel_stt.py --bench input.wav --workers 1,2,4 --size small
+"""
+import os
+import threading
+import time
+import wave
+import numpy as np
+
+import stt_worker
+from stt_models import estimated_memory_mb
+
+SAMPLE_RATE = 16000
+
+
+def load_wav(filename):
+    """Return mono float32 samples in [-1, 1] and the sample rate."""
+    with wave.open(filename, "rb") as wf:
+        fs = wf.getframerate()
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        raw = wf.readframes(wf.getnframes())
+    if width != 2:
+        raise ValueError(f"{filename}: expected 16-bit PCM, got {8 * width}-bit")
+    audio = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, fs
+
+
+def wav_duration(filename):
+    with wave.open(filename, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def frame_rms(audio, fs, frame_ms=30):
+    frame = max(1, int(fs * frame_ms / 1000))
+    n = len(audio) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = audio[: n * frame].reshape(n, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1) + 1e-12), frame
+
+
+def find_pauses(audio, fs, frame_ms=30, threshold=0.01, min_pause_ms=300):
+    """Return ``[(start_sample, end_sample), ...]`` of silent runs at least ``min_pause_ms`` long."""
+    rms, frame = frame_rms(audio, fs, frame_ms)
+    if not len(rms):
+        return []
+    silent = np.concatenate(([0], (rms < threshold).astype(np.int8), [0]))
+    edges = np.diff(silent)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    min_frames = max(1, int(min_pause_ms / frame_ms))
+    keep = (ends - starts) >= min_frames
+    return [(int(s) * frame, int(e) * frame) for s, e in zip(starts[keep], ends[keep])]
+
+
+def split_on_pauses(audio, fs, target_s=8.0, max_s=20.0, **pause_kwargs):
+    """Return chunk ``(start, end)`` sample ranges cut at pause midpoints.
+
+    Chunks grow until they pass ``target_s`` and are cut at the next pause; a chunk
+    with no pause before ``max_s`` is cut hard there.
+    """
+    total = len(audio)
+    cuts = [(s + e) // 2 for s, e in find_pauses(audio, fs, **pause_kwargs)]
+    target, limit = int(target_s * fs), int(max_s * fs)
+    chunks = []
+    start = 0
+    for cut in cuts + [total]:
+        while cut - start > limit:
+            chunks.append((start, start + limit))
+            start += limit
+        if cut - start >= target or cut == total:
+            if cut > start:
+                chunks.append((start, cut))
+            start = cut
+    return chunks
+
+
+# ---- worker side (runs in stt_worker processes) ----
+def _transcribe_chunk(index, samples, language, beam_size):
+    segments, info = stt_worker.get_model().transcribe(samples, language=language, beam_size=beam_size)
+    return index, " ".join(s.text.strip() for s in segments).strip(), info.language
+
+
+class ParallelTranscriber:
+    def __init__(self, size="small", compute_type="int8", workers=2, cpu_threads=0, beam_size=5, idle_timeout=300.0):
+        self.size = size
+        self.compute_type = compute_type
+        self.workers = max(1, workers)
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 2) // self.workers)
+        self.beam_size = beam_size
+        self.idle_timeout = idle_timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self._idle_timer = None
+        self.starts = 0
+        self.transcriptions = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            self.starts += 1
+            self._pool = stt_worker.start_pool(self.workers, self.size, self.compute_type, self.cpu_threads)
+        return self._pool
+
+    def transcribe(self, filename, language=None):
+        """Transcribe ``filename``; ``language`` (e.g. "ta") skips detection."""
+        audio, fs = load_wav(filename)
+        if fs != SAMPLE_RATE:
+            raise ValueError(f"{filename}: expected {SAMPLE_RATE} Hz audio, got {fs}")
+        chunks = split_on_pauses(audio, fs)
+        with self._lock:
+            self._cancel_idle_timer()
+            pool = self._get_pool()
+        try:
+            parts = []
+            if language is None and chunks:
+                # Detect once on the first chunk; the rest reuse its answer
+                s, e = chunks[0]
+                parts.append(pool.submit(_transcribe_chunk, 0, audio[s:e], None, self.beam_size).result())
+                language = parts[0][2]
+                chunks = chunks[1:]
+                first = 1
+            else:
+                first = 0
+            futures = [
+                pool.submit(_transcribe_chunk, i, audio[s:e], language, self.beam_size)
+                for i, (s, e) in enumerate(chunks, first)
+            ]
+            parts = sorted(parts + [f.result() for f in futures])
+        finally:
+            with self._lock:
+                self.transcriptions += 1
+                self._arm_idle_timer()
+        return " ".join(text for _, text, _ in parts if text).strip()
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _arm_idle_timer(self):
+        if self.idle_timeout > 0:
+            self._idle_timer = threading.Timer(self.idle_timeout, self.shutdown)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def stats(self):
+        with self._lock:
+            running = self._pool is not None
+        return {
+            "model": self.size,
+            "workers": self.workers,
+            "running": running,
+            "est_memory_mb": round(self.workers * estimated_memory_mb(self.size, self.compute_type)) if running else 0,
+            "starts": self.starts,
+            "transcriptions": self.transcriptions,
+        }
+
+    def shutdown(self):
+        """Stop the worker processes (and free their models); they restart on next use."""
+        with self._lock:
+            self._cancel_idle_timer()
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _bench(filename, worker_counts, size, compute_type, repeats):
+    duration = wav_duration(filename)
+    audio, fs = load_wav(filename)
+    chunks = split_on_pauses(audio, fs)
+    cores = os.cpu_count() or 1
+    print(f"{filename}: {duration:.1f}s audio, {len(chunks)} chunks, {cores} cores, model={size}/{compute_type}")
+    print(f"{'workers':>8} {'threads':>8} {'seconds':>9} {'speedup':>8} {'RTF':>6}")
+    baseline = None
+    for workers in worker_counts:
+        pt = ParallelTranscriber(size, compute_type, workers=workers, cpu_threads=max(1, cores // workers), idle_timeout=0)
+        pt.transcribe(filename)  # warm-up: load models in every worker
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            pt.transcribe(filename)
+            best = min(best, time.perf_counter() - start)
+        pt.shutdown()
+        baseline = baseline or best
+        print(f"{workers:>8} {pt.cpu_threads:>8} {best:>9.2f} {baseline / best:>7.2f}x {best / duration:>6.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark parallel chunked transcription across worker counts.")
+    parser.add_argument("--bench", required=True, metavar="WAV", help="16 kHz 16-bit WAV of a long dictation")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--size", default="small")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    _bench(args.bench, [int(w) for w in args.workers.split(",")], args.size, args.compute_type, args.repeats)
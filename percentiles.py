@@ -0,0 +1,9 @@
+"""Nearest-rank percentile shared by the session ``stats()`` snapshots."""
+
+
+def percentile(values, pct):
+    """The ``pct``-th percentile (0-100) of ``values`` by nearest rank, or None if empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))]
@@ -0,0 +1,348 @@
+"""Performance report built from the per-turn traces written by ``turn_trace``.
+
+Trace files are streamed line by line (plain ``.jsonl`` or ``.jsonl.gz``) and folded
+into fixed-size aggregates, so months of logs never need to fit in memory:
+- latency percentiles per stage use a log-bucketed histogram (~2% relative error)
+- cache hit rates and provider error rates are plain counters
+- slow-turn outliers are kept in a bounded min-heap
+"""
+import glob
+import gzip
+import heapq
+import io
+import itertools
+import json
+import math
+import os
+import time
+
+from docx import Document
+from docx.shared import Inches
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from generate_report import add_heading, add_para
+
+
+class LatencyHistogram:
+    """Streaming latency distribution with bounded memory."""
+
+    GROWTH = 1.02
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        ms = max(0.0, float(ms))
+        idx = 0 if ms < 1.0 else int(math.log(ms) / math.log(self.GROWTH)) + 1
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                # Upper edge of the bucket, capped at the observed max
+                return 1.0 if idx == 0 else min(self.max, self.GROWTH ** idx)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class TraceAggregator:
+    def __init__(self, top_n=20, slow_ms=5000.0):
+        self.top_n = top_n
+        self.slow_ms = slow_ms
+        self.turns = 0
+        self.bad_lines = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.outcomes = {}
+        self.modes = {}
+        self.mode_response = {}
+        self.translate_routes = {}
+        self.stages = {}
+        self.response = LatencyHistogram()
+        self.daily = {}
+        self.cache = {}
+        self.providers = {}
+        self.slow_turns = 0
+        self._slowest = []
+        self._seq = itertools.count()
+
+    def add(self, rec):
+        ts = rec.get("ts")
+        self.turns += 1
+        if ts is not None:
+            self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+            self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        outcome = rec.get("outcome") or "unknown"
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        mode = rec.get("mode") or "voice"
+        self.modes[mode] = self.modes.get(mode, 0) + 1
+        route = rec.get("translate_route")
+        if route:
+            self.translate_routes[route] = self.translate_routes.get(route, 0) + 1
+        for stage, ms in (rec.get("stages") or {}).items():
+            self.stages.setdefault(stage, LatencyHistogram()).add(ms)
+        for name, result in (rec.get("cache") or {}).items():
+            hits, total = self.cache.get(name, (0, 0))
+            self.cache[name] = (hits + (result == "hit"), total + 1)
+        errors = rec.get("errors") or {}
+        for stage, provider in (rec.get("providers") or {}).items():
+            key = (provider, stage)
+            errs, calls = self.providers.get(key, (0, 0))
+            self.providers[key] = (errs + (stage in errors), calls + 1)
+        response_ms = rec.get("response_ms")
+        if response_ms is None or outcome in ("empty", "exit", "interrupted"):
+            return
+        self.response.add(response_ms)
+        self.mode_response.setdefault(mode, LatencyHistogram()).add(response_ms)
+        if ts is not None:
+            day = time.strftime("%Y-%m-%d", time.localtime(ts))
+            self.daily.setdefault(day, LatencyHistogram()).add(response_ms)
+        if response_ms >= self.slow_ms:
+            self.slow_turns += 1
+        # The counter breaks ties so records (mode None vs str, stage dicts) are never compared
+        item = (response_ms, next(self._seq), ts or 0.0, rec.get("mode"), outcome, rec.get("stages") or {})
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, item)
+        elif item[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def add_file(self, path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    self.bad_lines += 1
+                    continue
+                if isinstance(rec, dict):
+                    self.add(rec)
+
+    def slowest(self):
+        """``(response_ms, ts, mode, outcome, stages)`` of the slowest turns, slowest first."""
+        return [(ms, ts, mode, outcome, stages)
+                for ms, _, ts, mode, outcome, stages in sorted(self._slowest, key=lambda item: item[0], reverse=True)]
+
+
+def iter_trace_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            files = glob.glob(os.path.join(path, "*.jsonl")) + glob.glob(os.path.join(path, "*.jsonl.gz"))
+            yield from sorted(files)
+        else:
+            yield from sorted(glob.glob(path))
+
+
+def aggregate(paths, slow_ms=5000.0):
+    agg = TraceAggregator(slow_ms=slow_ms)
+    for path in iter_trace_files(paths):
+        agg.add_file(path)
+    return agg
+
+
+def _fmt_ms(value):
+    return "-" if value is None else f"{value:,.0f}"
+
+
+def _fmt_pct(num, den):
+    return "-" if not den else f"{100.0 * num / den:.1f}%"
+
+
+def _add_rows(doc, header, rows):
+    table = doc.add_table(rows=1, cols=len(header))
+    table.style = "Light List"
+    for i, h in enumerate(header):
+        table.rows[0].cells[i].text = h
+    for row in rows:
+        cells = table.add_row().cells
+        for i, value in enumerate(row):
+            cells[i].text = str(value)
+    return table
+
+
+def _chart_stage_latency(agg):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return None
+    names = sorted(agg.stages)
+    p50 = [agg.stages[n].percentile(50) or 0 for n in names]
+    p95 = [agg.stages[n].percentile(95) or 0 for n in names]
+    fig, ax = plt.subplots(figsize=(6.5, 3))
+    xs = range(len(names))
+    ax.bar([x - 0.2 for x in xs], p50, width=0.4, label="p50")
+    ax.bar([x + 0.2 for x in xs], p95, width=0.4, label="p95")
+    ax.set_xticks(list(xs))
+    ax.set_xticklabels(names)
+    ax.set_ylabel("ms")
+    ax.set_title("Latency by stage")
+    ax.legend()
+    return _fig_png(fig, plt)
+
+
+def _chart_daily(agg):
+    if len(agg.daily) < 2:
+        return None
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return None
+    days = sorted(agg.daily)
+    fig, ax = plt.subplots(figsize=(6.5, 3))
+    ax.plot(days, [agg.daily[d].percentile(50) for d in days], label="p50")
+    ax.plot(days, [agg.daily[d].percentile(95) for d in days], label="p95")
+    ax.set_ylabel("response ms")
+    ax.set_title("Daily response latency")
+    step = max(1, len(days) // 10)
+    ax.set_xticks(days[::step])
+    ax.tick_params(axis="x", labelrotation=45, labelsize=7)
+    ax.legend()
+    return _fig_png(fig, plt)
+
+
+def _fig_png(fig, plt):
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format="png", dpi=120)
+    plt.close(fig)
+    buf.seek(0)
+    return buf
+
+
+def build_perf_report(agg) -> Document:
+    doc = Document()
+    title = doc.add_heading("AI-Powered Voice Shell — Performance Report", 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    span = "-"
+    if agg.first_ts is not None:
+        span = f"{time.strftime('%Y-%m-%d', time.localtime(agg.first_ts))} to {time.strftime('%Y-%m-%d', time.localtime(agg.last_ts))}"
+    add_para(doc, f"Turns analysed: {agg.turns:,} | Period: {span} | Unreadable lines skipped: {agg.bad_lines}")
+
+    add_heading(doc, "Summary", 1)
+    add_para(
+        doc,
+        (
+            f"Response latency (excluding time spent speaking): p50 {_fmt_ms(agg.response.percentile(50))} ms, "
+            f"p95 {_fmt_ms(agg.response.percentile(95))} ms, p99 {_fmt_ms(agg.response.percentile(99))} ms. "
+            f"{agg.slow_turns:,} turns took longer than {agg.slow_ms:,.0f} ms."
+        ),
+    )
+    _add_rows(
+        doc,
+        ["Outcome", "Turns", "Share"],
+        [(k, f"{v:,}", _fmt_pct(v, agg.turns)) for k, v in sorted(agg.outcomes.items(), key=lambda kv: -kv[1])],
+    )
+    if len(agg.modes) > 1:
+        doc.add_paragraph()
+        _add_rows(
+            doc,
+            ["Input mode", "Turns", "p50 ms", "p95 ms"],
+            [
+                (
+                    k, f"{v:,}",
+                    _fmt_ms(agg.mode_response[k].percentile(50)) if k in agg.mode_response else "-",
+                    _fmt_ms(agg.mode_response[k].percentile(95)) if k in agg.mode_response else "-",
+                )
+                for k, v in sorted(agg.modes.items())
+            ],
+        )
+
+    add_heading(doc, "Latency by stage", 1)
+    _add_rows(
+        doc,
+        ["Stage", "Count", "Mean ms", "p50 ms", "p90 ms", "p95 ms", "p99 ms", "Max ms"],
+        [
+            (
+                name, f"{h.count:,}", _fmt_ms(h.mean), _fmt_ms(h.percentile(50)), _fmt_ms(h.percentile(90)),
+                _fmt_ms(h.percentile(95)), _fmt_ms(h.percentile(99)), _fmt_ms(h.max),
+            )
+            for name, h in sorted(agg.stages.items())
+        ],
+    )
+    add_para(doc, "The 'record' stage is time spent waiting for and listening to the user, not processing time.")
+    chart = _chart_stage_latency(agg)
+    if chart is not None:
+        doc.add_picture(chart, width=Inches(6.5))
+    chart = _chart_daily(agg)
+    if chart is not None:
+        doc.add_picture(chart, width=Inches(6.5))
+    if chart is None and not agg.stages:
+        add_para(doc, "No stage timings found.")
+
+    add_heading(doc, "Cache hit rates", 1)
+    if agg.cache:
+        _add_rows(
+            doc,
+            ["Cache", "Lookups", "Hits", "Hit rate"],
+            [(name, f"{total:,}", f"{hits:,}", _fmt_pct(hits, total)) for name, (hits, total) in sorted(agg.cache.items())],
+        )
+    else:
+        add_para(doc, "No cache lookups recorded.")
+
+    if agg.translate_routes:
+        routed = sum(agg.translate_routes.values())
+        skipped = routed - agg.translate_routes.get("gemini", 0)
+        add_heading(doc, "Translation routing", 1)
+        add_para(doc, f"Gemini translation skipped for {_fmt_pct(skipped, routed)} of {routed:,} transcripts.")
+        _add_rows(
+            doc,
+            ["Route", "Transcripts", "Share"],
+            [(k, f"{v:,}", _fmt_pct(v, routed)) for k, v in sorted(agg.translate_routes.items())],
+        )
+
+    add_heading(doc, "Provider error rates", 1)
+    if agg.providers:
+        _add_rows(
+            doc,
+            ["Provider", "Stage", "Calls", "Errors", "Error rate"],
+            [
+                (provider, stage, f"{calls:,}", f"{errs:,}", _fmt_pct(errs, calls))
+                for (provider, stage), (errs, calls) in sorted(agg.providers.items())
+            ],
+        )
+    else:
+        add_para(doc, "No provider calls recorded.")
+
+    add_heading(doc, "Slowest turns", 1)
+    slowest = agg.slowest()
+    if slowest:
+        _add_rows(
+            doc,
+            ["When", "Mode", "Outcome", "Response ms", "Slowest stage"],
+            [
+                (
+                    time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else "-",
+                    mode or "-",
+                    outcome,
+                    _fmt_ms(ms),
+                    max(stages.items(), key=lambda kv: kv[1] if kv[0] != "record" else -1)[0] if stages else "-",
+                )
+                for ms, ts, mode, outcome, stages in slowest
+            ],
+        )
+    else:
+        add_para(doc, "No completed turns recorded.")
+
+    return doc
@@ -0,0 +1,243 @@
+"""Client-side rate limiting and request coalescing for LLM calls.
+
+``LLMRateLimiter`` holds two token buckets, requests/minute and tokens/minute.
+Callers wait in a priority queue (lower number = served first; interactive turns
+use 0, batch jobs a higher number). When ``state_dir`` is set, the bucket state
+lives in a small JSON file guarded by a lock file, so every front-end sharing an
+API key (TUI, CLI, batch scripts) draws from the same budget.
+
+The queue only orders callers within one process. Across processes, priority is
+enforced through the shared buckets: callers with priority > 0 may only take
+tokens above ``reserve_fraction`` of each bucket, so a batch script can never drain
+the budget an interactive turn in another process needs.
+
+``InFlightCoalescer`` merges identical prompts that are already in flight into
+one upstream call.
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+from percentiles import percentile
+
+
+def estimate_tokens(prompt, expected_output=150):
+    # ~4 characters per token is close enough for budgeting
+    return len(prompt) // 4 + expected_output
+
+
+@contextmanager
+def _file_lock(path, stale_after=5.0):
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > stale_after:
+                    # A holder crashed; take the lock over
+                    os.remove(path)
+                    continue
+            except OSError:
+                pass
+            time.sleep(0.005)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _MemoryState:
+    def __init__(self, initial):
+        self._state = dict(initial)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield self._state
+
+
+class _FileState:
+    def __init__(self, path, initial):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.initial = initial
+        self._local = threading.Lock()
+
+    @contextmanager
+    def transaction(self):
+        with self._local, _file_lock(self.lock_path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = dict(self.initial)
+            yield state
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+
+
+class LLMRateLimiter:
+    def __init__(self, requests_per_min=60, tokens_per_min=1_000_000, state_dir=None, key="default",
+                 reserve_fraction=0.2):
+        self.req_rate = requests_per_min / 60.0
+        self.tok_rate = tokens_per_min / 60.0
+        self.req_capacity = max(1.0, float(requests_per_min))
+        self.tok_capacity = max(1.0, float(tokens_per_min))
+        self.reserve_fraction = min(max(float(reserve_fraction), 0.0), 0.9)
+        initial = {"req": self.req_capacity, "tok": self.tok_capacity, "ts": time.time(), "not_before": 0.0}
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+            digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+            self._state = _FileState(os.path.join(state_dir, f"llm-limits-{digest}.json"), initial)
+        else:
+            self._state = _MemoryState(initial)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._waits_ms = deque(maxlen=500)
+        self.max_depth = 0
+        self.granted = 0
+        self.throttled = 0
+        self.timeouts = 0
+
+    def _refill(self, state, now):
+        elapsed = max(0.0, now - state["ts"])
+        state["req"] = min(self.req_capacity, state["req"] + elapsed * self.req_rate)
+        state["tok"] = min(self.tok_capacity, state["tok"] + elapsed * self.tok_rate)
+        state["ts"] = now
+
+    def _try_take(self, tokens, priority=0):
+        """Take 1 request + ``tokens`` if available; else return seconds until they will be.
+
+        Priority > 0 must leave the reserved part of both buckets untouched.
+        """
+        tokens = min(float(tokens), self.tok_capacity)
+        reserve = self.reserve_fraction if priority > 0 else 0.0
+        need_req = 1.0 + reserve * self.req_capacity
+        need_tok = min(tokens + reserve * self.tok_capacity, self.tok_capacity)
+        with self._state.transaction() as state:
+            now = time.time()
+            self._refill(state, now)
+            if now < state.get("not_before", 0.0):
+                return state["not_before"] - now
+            if state["req"] >= need_req and state["tok"] >= need_tok:
+                state["req"] -= 1.0
+                state["tok"] -= tokens
+                return 0.0
+            wait_req = (need_req - state["req"]) / self.req_rate if state["req"] < need_req else 0.0
+            wait_tok = (need_tok - state["tok"]) / self.tok_rate if state["tok"] < need_tok else 0.0
+            return max(wait_req, wait_tok, 0.01)
+
+    def try_acquire(self, tokens, priority=0):
+        """Non-blocking acquire that never jumps ahead of queued callers."""
+        with self._cond:
+            if self._queue:
+                return False
+            return self._try_take(tokens, priority) == 0.0
+
+    def acquire(self, tokens, priority=0, timeout=None):
+        """Block until the budget allows one request of ``tokens``; raises TimeoutError."""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self.max_depth = max(self.max_depth, len(self._queue))
+            throttled = False
+            try:
+                while True:
+                    wait_s = 0.5
+                    if self._queue[0] == entry:
+                        wait_s = self._try_take(tokens, priority)
+                        if wait_s == 0.0:
+                            heapq.heappop(self._queue)
+                            entry = None
+                            self._cond.notify_all()
+                            break
+                        throttled = True
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise TimeoutError("Timed out waiting for the LLM rate limit")
+                        wait_s = min(wait_s, remaining)
+                    self._cond.wait(timeout=wait_s)
+            finally:
+                if entry is not None:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+            self.granted += 1
+            self.throttled += throttled
+            self._waits_ms.append((time.monotonic() - start) * 1000.0)
+
+    def pause(self, seconds):
+        """Stop granting requests for ``seconds`` (e.g. after the provider returns 429)."""
+        with self._state.transaction() as state:
+            state["not_before"] = max(state.get("not_before", 0.0), time.time() + seconds)
+
+    def stats(self):
+        with self._cond:
+            waits = list(self._waits_ms)
+            depth = len(self._queue)
+        pick = lambda pct: round(percentile(waits, pct), 1) if waits else None
+        return {
+            "queue_depth": depth,
+            "max_queue_depth": self.max_depth,
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+            "wait_ms_p50": pick(50),
+            "wait_ms_p95": pick(95),
+        }
+
+
+class InFlightCoalescer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.coalesced = 0
+
+    def run(self, key, fn, timeout=None):
+        """Return ``fn()``, sharing the result with concurrent callers using the same key.
+
+        A caller that joins an in-flight call waits at most ``timeout`` seconds for it.
+        """
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return fut.result(timeout=timeout)
+            except FutureTimeoutError:
+                raise TimeoutError("Timed out waiting for an identical in-flight LLM call") from None
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
@@ -0,0 +1,279 @@
+"""Bounded automatic repair of failed shell commands.
+
+When a generated command exits non-zero, ``repair_command`` sends the original
+instruction, the failed command and the tail of its stderr back to the LLM (as
+JSON) and runs the corrected command. It stops at ``max_attempts`` fixes or
+``budget_s`` seconds in total, whichever comes first. It also stops when the
+model gives up, repeats a command it already tried, or proposes something the
+sanitizer rejects.
+
+Simulate time-to-success with and without repair (stub LLM, fake executor):
+
+    python repair.py --trials 500 --fix-rate 0.8
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from percentiles import percentile
+
+REPAIR_PROMPT = """
+You are fixing a Linux shell command that failed in WSL.
+- Output a single non-interactive Linux command only (no explanations).
+- STRICTLY FORBIDDEN: editors/pagers or any interactive tools (nano, vi, vim, emacs, ed, less, more, man, top, htop, watch, code).
+- Keep the user's intent; change only what the error shows is wrong (paths, flags, missing -p/-r, program names).
+- If the error cannot be fixed by changing the command (missing file the user meant, permissions, missing package), give up.
+Failure (JSON):
+{payload}
+Respond in strict JSON:
+{{"command": "fixed_shell_command_here", "give_up": false}}
+"""
+
+
+def truncate_stderr(stderr, limit=600):
+    """Keep the end of stderr, where the actual error usually is."""
+    stderr = (stderr or "").strip()
+    if len(stderr) <= limit:
+        return stderr
+    return "…" + stderr[-limit:]
+
+
+def build_repair_prompt(instruction, failed_cmd, stderr, rc, tried=()):
+    payload = {
+        "instruction": instruction,
+        "failed_command": failed_cmd,
+        "exit_code": rc,
+        "stderr": truncate_stderr(stderr),
+    }
+    if tried:
+        payload["already_tried"] = list(tried)
+    return REPAIR_PROMPT.format(payload=json.dumps(payload, ensure_ascii=False, indent=2))
+
+
+def parse_repair(text):
+    """Return the proposed command, or "" if the model gave up or answered badly."""
+    m = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if not m:
+        return ""
+    try:
+        data = json.loads(m.group())
+    except ValueError:
+        return ""
+    if str(data.get("give_up", "")).strip().lower() in ("true", "yes", "1"):
+        return ""
+    return str(data.get("command", "")).replace("`", "").strip()
+
+
+class RepairResult:
+    def __init__(self):
+        self.ok = False
+        self.command = None
+        self.rc = None
+        self.stderr = ""
+        self.attempts = 0
+        self.elapsed_s = 0.0
+        self.reason = None
+        self.tried = []
+
+    def as_dict(self):
+        return {
+            "ok": self.ok,
+            "command": self.command,
+            "rc": self.rc,
+            "attempts": self.attempts,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "reason": self.reason,
+        }
+
+
+def repair_command(instruction, failed_cmd, stderr, rc, generate, execute, sanitize=None,
+                   max_attempts=2, budget_s=20.0, clock=time.monotonic):
+    """Try up to ``max_attempts`` LLM fixes for ``failed_cmd`` within ``budget_s`` seconds.
+
+    ``generate(prompt, timeout) -> str`` calls the LLM, ``execute(command) -> (rc, stderr)``
+    runs a command and ``sanitize(command) -> command or ""`` vets every proposal.
+    ``reason`` on the result is one of: fixed, attempts, budget, gave_up, repeated,
+    unsafe, llm_error.
+    """
+    result = RepairResult()
+    start = clock()
+    tried = [failed_cmd]
+    result.stderr = stderr
+    while True:
+        if result.attempts >= max_attempts:
+            result.reason = "attempts"
+            break
+        remaining = budget_s - (clock() - start)
+        if remaining <= 0:
+            result.reason = "budget"
+            break
+        result.attempts += 1
+        try:
+            text = generate(build_repair_prompt(instruction, failed_cmd, stderr, rc, tried[1:]), remaining)
+        except Exception:
+            result.reason = "llm_error"
+            break
+        proposal = parse_repair(text)
+        if not proposal:
+            result.reason = "gave_up"
+            break
+        if sanitize is not None:
+            proposal = sanitize(proposal)
+            if not proposal:
+                result.reason = "unsafe"
+                break
+        if proposal in tried:
+            result.reason = "repeated"
+            break
+        if clock() - start >= budget_s:
+            result.reason = "budget"
+            break
+        tried.append(proposal)
+        rc, stderr = execute(proposal)
+        result.command, result.rc, result.stderr = proposal, rc, stderr
+        if rc == 0:
+            result.ok = True
+            result.reason = "fixed"
+            break
+        failed_cmd = proposal
+    result.tried = tried[1:]
+    result.elapsed_s = clock() - start
+    return result
+
+
+class RepairStats:
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._success_s = deque(maxlen=window)
+        self.invoked = 0
+        self.fixed = 0
+        self.attempts = 0
+        self.reasons = {}
+
+    def add(self, result):
+        with self._lock:
+            self.invoked += 1
+            self.attempts += result.attempts
+            self.reasons[result.reason] = self.reasons.get(result.reason, 0) + 1
+            if result.ok:
+                self.fixed += 1
+                self._success_s.append(result.elapsed_s)
+
+    def snapshot(self):
+        with self._lock:
+            lat = list(self._success_s)
+            pick = lambda pct: round(percentile(lat, pct), 2) if lat else None
+            return {
+                "invoked": self.invoked,
+                "fixed": self.fixed,
+                "fix_rate": (self.fixed / self.invoked) if self.invoked else 0.0,
+                "llm_attempts": self.attempts,
+                "stop_reasons": dict(self.reasons),
+                "repair_s_p50": pick(50),
+                "repair_s_p95": pick(95),
+            }
+
+
+# ---- simulation: stub LLM + fake executor on a virtual clock ----
+# (instruction, first generated command, stderr it fails with, working fix or None)
+SCENARIOS = [
+    ("list the files in docs", "ls doc", "ls: cannot access 'doc': No such file or directory", "ls docs"),
+    ("make folder a/b/c", "mkdir a/b/c", "mkdir: cannot create directory 'a/b/c': No such file or directory", "mkdir -p a/b/c"),
+    ("run script.py", "python script.py", "bash: line 1: python: command not found", "python3 script.py"),
+    ("copy folder to backup", "cp folder backup", "cp: -r not specified; omitting directory 'folder'", "cp -r folder backup"),
+    ("delete the build folder", "rm build", "rm: cannot remove 'build': Is a directory", "rm -r build"),
+    ("count lines in main.py", "wc -l main", "wc: main: No such file or directory", "wc -l main.py"),
+    ("show notes.txt", "cat notes.txt", "cat: notes.txt: No such file or directory", None),
+    ("extract data.zip", "unzip data.zip", "bash: line 1: unzip: command not found", None),
+]
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def simulate(trials=200, fix_rate=0.8, reask_fix_rate=0.4, user_retries=3, max_attempts=2, budget_s=20.0,
+             record_s=3.0, stt_s=0.9, translate_s=0.8, llm_s=1.1, exec_s=0.3, seed=7):
+    """Return per-mode ``{"successes", "trials", "times"}`` for repair vs. re-asking.
+
+    Both modes run every turn through the same stub LLM and fake executor, each
+    with its own RNG seeded from ``seed``. A turn whose command fails is repaired
+    first in ``with_repair``; if that does not fix it, the user re-asks as in
+    ``without_repair`` (up to ``user_retries`` times).
+    """
+    pick_scenario = random.Random(seed)
+    rngs = {mode: random.Random(f"{seed}:{mode}") for mode in ("without_repair", "with_repair")}
+    out = {mode: {"successes": 0, "trials": 0, "times": []} for mode in rngs}
+    for _ in range(trials):
+        instruction, bad, err, fix = pick_scenario.choice(SCENARIOS)
+        for mode, rng in rngs.items():
+            clock = SimClock()
+            asks = [0]
+
+            def stub_llm(prompt, timeout):
+                clock.advance(min(llm_s, timeout))
+                if '"failed_command"' in prompt:
+                    # Repair prompt: the stderr usually points straight at the fix
+                    if fix is None:
+                        return '{"command": "", "give_up": true}'
+                    proposal = fix if rng.random() < fix_rate else f"{bad} 2>&1"
+                else:
+                    # Fresh request: the first one always yields the failing command
+                    asks[0] += 1
+                    ok = fix is not None and asks[0] > 1 and rng.random() < reask_fix_rate
+                    proposal = fix if ok else bad
+                return json.dumps({"command": proposal, "give_up": False})
+
+            def fake_exec(command):
+                clock.advance(exec_s)
+                return (0, "") if command == fix else (1, err)
+
+            def turn():
+                clock.advance(record_s + stt_s + translate_s)
+                command = parse_repair(stub_llm(instruction, budget_s))
+                rc, stderr = fake_exec(command)
+                if rc == 0:
+                    return True
+                if mode == "without_repair":
+                    return False
+                return repair_command(instruction, command, stderr, rc, stub_llm, fake_exec, sanitize=str.strip,
+                                      max_attempts=max_attempts, budget_s=budget_s, clock=clock).ok
+
+            ok = any(turn() for _ in range(1 + user_retries))
+            out[mode]["trials"] += 1
+            if ok:
+                out[mode]["successes"] += 1
+                out[mode]["times"].append(clock())
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate time-to-success with and without the repair loop.")
+    parser.add_argument("--trials", type=int, default=500)
+    parser.add_argument("--fix-rate", type=float, default=0.8, help="chance the LLM fixes a command given its stderr")
+    parser.add_argument("--reask-fix-rate", type=float, default=0.4, help="chance a re-spoken request yields a working command")
+    parser.add_argument("--max-attempts", type=int, default=2)
+    parser.add_argument("--budget-s", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    res = simulate(args.trials, args.fix_rate, args.reask_fix_rate, max_attempts=args.max_attempts,
+                   budget_s=args.budget_s, seed=args.seed)
+    print(f"{'mode':<16} {'success':>8} {'p50 s':>7} {'p95 s':>7} {'mean s':>7}")
+    for name, r in res.items():
+        times = r["times"]
+        pick = lambda pct: percentile(times, pct) if times else float("nan")
+        mean = sum(times) / len(times) if times else float("nan")
+        print(f"{name:<16} {r['successes'] / r['trials']:>7.0%} {pick(50):>7.1f} {pick(95):>7.1f} {mean:>7.1f}")
@@ -0,0 +1,271 @@
+"""Lifecycle manager for the local faster-whisper model.
+
+The model is loaded on demand, unloaded after ``idle_timeout`` seconds without
+use, and reloaded in the background as soon as speech is detected (``prefetch``).
+When a memory budget is set, or the host is short on free memory, a smaller
+model size is chosen instead of the configured one.
+
+``manager.stats()`` reports resident memory, reload latency and the time spent
+loaded vs unloaded.
+"""
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from percentiles import percentile
+
+# Rough resident size in MB of faster-whisper models on CPU (float32 weights).
+MODEL_MEMORY_MB = {"tiny": 150, "base": 290, "small": 950, "medium": 2900, "large-v3": 6000}
+# Interpreter, numpy and CTranslate2 runtime of one stt_worker process, on top of its model
+WORKER_OVERHEAD_MB = 120
+# Smallest-first order used when falling back under memory pressure
+MODEL_SIZES = ["tiny", "base", "small", "medium", "large-v3"]
+
+
+def model_family(size):
+    """Entry of ``MODEL_SIZES`` that ``size`` is a variant of (``small.en`` → small,
+    ``large-v2``/``distil-large-v3`` → large-v3), or None for custom models."""
+    name = size.lower()
+    if name.startswith("distil-"):
+        name = name[len("distil-"):]
+    if name.endswith(".en"):
+        name = name[: -len(".en")]
+    if name == "large" or name.startswith("large-"):
+        return "large-v3"
+    return name if name in MODEL_SIZES else None
+
+
+def estimated_memory_mb(size, compute_type):
+    base = MODEL_MEMORY_MB.get(model_family(size) or "small")
+    # int8 weights are roughly a third of float32; float16 about half
+    if compute_type.startswith("int8"):
+        return base * 0.35
+    if "16" in compute_type:
+        return base * 0.55
+    return base
+
+
+def available_memory_mb():
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def process_rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class WhisperModelManager:
+    def __init__(self, loader, size="small", compute_type="int8", idle_timeout=300.0, memory_budget_mb=0.0):
+        """``loader(size, compute_type)`` returns a model; ``memory_budget_mb=0`` means no budget."""
+        self._loader = loader
+        self.size = size
+        self.compute_type = compute_type
+        self.idle_timeout = idle_timeout
+        self.memory_budget_mb = memory_budget_mb
+        self._model = None
+        self._loaded_size = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loading = None
+        self._in_use = 0
+        self._last_used = time.monotonic()
+        self._state_since = time.monotonic()
+        self._loaded_seconds = 0.0
+        self._unloaded_seconds = 0.0
+        self._reload_ms = []
+        self.loads = 0
+        self.unloads = 0
+        self.downgrades = 0
+        self._reaper = None
+        self._pool = None
+
+    # ---- sizing ----
+    def memory_limit_mb(self):
+        """Memory the model(s) may use: the budget, capped at 80% of what is free."""
+        limit = float("inf")
+        if self.memory_budget_mb:
+            limit = self.memory_budget_mb
+        avail = available_memory_mb()
+        if avail is not None:
+            limit = min(limit, avail * 0.8)
+        return limit
+
+    def choose_size(self, limit=None):
+        """The configured size, or the largest smaller family that fits ``limit`` MB.
+
+        ``limit`` defaults to ``memory_limit_mb()``. Custom model names are never
+        replaced, as their size is unknown.
+        """
+        if limit is None:
+            limit = self.memory_limit_mb()
+        family = model_family(self.size)
+        if family is None or estimated_memory_mb(self.size, self.compute_type) <= limit:
+            return self.size
+        english = self.size.endswith(".en")
+        smaller = MODEL_SIZES[: MODEL_SIZES.index(family)] or MODEL_SIZES[:1]
+        for size in reversed(smaller):
+            if estimated_memory_mb(size, self.compute_type) <= limit:
+                break
+        # Keep an English-only model English-only (there is no large-v3.en)
+        return size + ".en" if english and size != "large-v3" else size
+
+    def plan_pool(self, workers):
+        """``(size, workers)`` for a pool of model processes that fits the memory limit.
+
+        The pool shares the limit with the in-process model if that is loaded, and
+        each worker also costs ``WORKER_OVERHEAD_MB``. Workers are dropped before the
+        model is shrunk; ``workers < 2`` means a pool is not worth starting.
+        """
+        limit = self.memory_limit_mb()
+        with self._lock:
+            if self._loaded_size is not None:
+                limit -= estimated_memory_mb(self._loaded_size, self.compute_type)
+        if model_family(self.size) is None:
+            return self.size, workers
+        for n in range(workers, 1, -1):
+            if n * (estimated_memory_mb(self.size, self.compute_type) + WORKER_OVERHEAD_MB) <= limit:
+                return self.size, n
+        size = self.choose_size(limit / 2 - WORKER_OVERHEAD_MB)
+        if 2 * (estimated_memory_mb(size, self.compute_type) + WORKER_OVERHEAD_MB) > limit:
+            return size, 1
+        if size != self.size:
+            self.downgrades += 1
+            print(f"⚠️ Memory is tight; parallel Whisper workers use '{size}' instead of '{self.size}'")
+        return size, 2
+
+    def attach_pool(self, pool):
+        """Report ``pool.stats()`` (e.g. a ``parallel_stt.ParallelTranscriber``) in ``stats()``."""
+        self._pool = pool
+
+    # ---- loading ----
+    def _ensure_loaded(self):
+        with self._load_lock:
+            model = self._model
+            if model is None:
+                model = self._load()
+            return model
+
+    def _load(self):
+        size = self.choose_size()
+        if size != self.size:
+            self.downgrades += 1
+            print(f"⚠️ Memory is tight; loading Whisper '{size}' instead of '{self.size}'")
+        start = time.monotonic()
+        model = self._loader(size, self.compute_type)
+        elapsed_ms = (time.monotonic() - start) * 1000.0
+        with self._lock:
+            self._mark_state()
+            self._model = model
+            self._loaded_size = size
+            self._last_used = time.monotonic()
+            self.loads += 1
+            self._reload_ms.append(elapsed_ms)
+            del self._reload_ms[:-50]
+        self._ensure_reaper()
+        return model
+
+    def _mark_state(self):
+        now = time.monotonic()
+        if self._model is None:
+            self._unloaded_seconds += now - self._state_since
+        else:
+            self._loaded_seconds += now - self._state_since
+        self._state_since = now
+
+    def prefetch(self):
+        """Start loading in the background if the model is not resident."""
+        with self._lock:
+            if self._model is not None or self._loading is not None:
+                return
+            self._loading = threading.Thread(target=self._prefetch_worker, name="whisper-prefetch", daemon=True)
+            self._loading.start()
+
+    def _prefetch_worker(self):
+        try:
+            self._ensure_loaded()
+        except Exception as e:
+            print("⚠️ Background Whisper load failed:", e)
+        finally:
+            with self._lock:
+                self._loading = None
+
+    @contextmanager
+    def use(self):
+        """Yield the loaded model, loading it (or waiting for a prefetch) if needed."""
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield self._ensure_loaded()
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._last_used = time.monotonic()
+
+    # ---- idle unload ----
+    def _ensure_reaper(self):
+        if self.idle_timeout <= 0 or (self._reaper is not None and self._reaper.is_alive()):
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name="whisper-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, min(30.0, self.idle_timeout / 4.0))
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if self._model is None:
+                    return
+                if self._in_use or time.monotonic() - self._last_used < self.idle_timeout:
+                    continue
+            self.unload()
+            return
+
+    def unload(self):
+        with self._lock:
+            if self._model is None or self._in_use:
+                return
+            self._mark_state()
+            self._model = None
+            self._loaded_size = None
+            self.unloads += 1
+        gc.collect()
+        print(f"💤 Whisper model unloaded after {self.idle_timeout:.0f}s idle")
+
+    def stats(self):
+        pool = self._pool.stats() if self._pool is not None else None
+        with self._lock:
+            self._mark_state()
+            return {
+                "parallel": pool,
+                "loaded_model": self._loaded_size,
+                "rss_mb": round(process_rss_mb() or 0.0, 1) or None,
+                "loads": self.loads,
+                "unloads": self.unloads,
+                "downgrades": self.downgrades,
+                "reload_ms_last": round(self._reload_ms[-1], 1) if self._reload_ms else None,
+                "reload_ms_p50": round(percentile(self._reload_ms, 50), 1) if self._reload_ms else None,
+                "loaded_seconds": round(self._loaded_seconds, 1),
+                "unloaded_seconds": round(self._unloaded_seconds, 1),
+            }
@@ -0,0 +1,209 @@
+"""Benchmark faster-whisper settings on this CPU and save the best as a profile.
+
+The labelled set is a directory of ``name.wav`` files with ``name.txt``
+reference transcripts next to them (or a ``manifest.jsonl`` of
+``{"audio": "path.wav", "text": "reference"}`` lines).
+
+Every combination of model size × compute type × thread count is loaded in a
+fresh process so its peak RSS is measured in isolation; beam sizes are swept
+inside that process. The winner is the fastest configuration whose word error
+rate is within ``--wer-tolerance`` of the most accurate one (and under
+``--max-rss-mb`` if given). It is written to ``stt_profile.json``, which
+``voice_shell_tunglish.whisper_transcribe`` loads at startup.
+
+    python stt_tune.py labelled_wavs/ --sizes tiny,base,small --threads 2,4
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+
+def load_profile(path="stt_profile.json"):
+    """Return the saved profile dict, or {} if there is none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return profile if isinstance(profile, dict) else {}
+
+
+def load_labelled_set(path):
+    if os.path.isfile(path):
+        manifest, base = path, os.path.dirname(path)
+    else:
+        manifest, base = os.path.join(path, "manifest.jsonl"), path
+    samples = []
+    if os.path.isfile(manifest):
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    samples.append((os.path.join(base, row["audio"]), row["text"]))
+        return samples
+    for name in sorted(os.listdir(path)):
+        stem, ext = os.path.splitext(name)
+        ref = os.path.join(path, stem + ".txt")
+        if ext.lower() == ".wav" and os.path.isfile(ref):
+            with open(ref, encoding="utf-8") as f:
+                samples.append((os.path.join(path, name), f.read().strip()))
+    return samples
+
+
+def _words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Return (edit distance in words, reference word count)."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1], len(ref)
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process in MB (None if it cannot be measured)."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, KiB on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024.0
+    try:
+        import psutil
+    except ImportError:
+        return None
+    # Windows reports the peak working set; other platforms only the current RSS
+    peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+    return peak / (1024 * 1024) if peak is not None else None
+
+
+def _run_config(size, compute_type, threads, beams, samples):
+    """Child process: load one model and time every beam size over the set."""
+    from faster_whisper import WhisperModel
+
+    start = time.perf_counter()
+    model = WhisperModel(size, device="cpu", compute_type=compute_type, cpu_threads=threads)
+    load_s = time.perf_counter() - start
+    results = []
+    for beam in beams:
+        latencies, errors, words, audio_s = [], 0, 0, 0.0
+        for path, ref in samples:
+            t0 = time.perf_counter()
+            segments, info = model.transcribe(path, beam_size=beam)
+            text = " ".join(s.text.strip() for s in segments)
+            latencies.append(time.perf_counter() - t0)
+            audio_s += info.duration
+            e, n = word_errors(ref, text)
+            errors += e
+            words += n
+        latencies.sort()
+        results.append({
+            "model_size": size,
+            "compute_type": compute_type,
+            "cpu_threads": threads,
+            "beam_size": beam,
+            "load_s": round(load_s, 2),
+            "latency_s_mean": round(sum(latencies) / len(latencies), 3),
+            "latency_s_p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3),
+            "rtf": round(sum(latencies) / audio_s, 3) if audio_s else None,
+            "wer": round(errors / words, 4) if words else None,
+        })
+    rss = _peak_rss_mb()
+    for r in results:
+        r["peak_rss_mb"] = round(rss, 1) if rss is not None else None
+    return results
+
+
+def pick_best(results, wer_tolerance=0.02, max_rss_mb=None):
+    ok = [r for r in results if r["wer"] is not None]
+    if max_rss_mb:
+        ok = [r for r in ok if r["peak_rss_mb"] is None or r["peak_rss_mb"] <= max_rss_mb]
+    if not ok:
+        return None
+    best_wer = min(r["wer"] for r in ok)
+    eligible = [r for r in ok if r["wer"] <= best_wer + wer_tolerance]
+    return min(eligible, key=lambda r: (r["latency_s_mean"], r["peak_rss_mb"] or 0))
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Tune faster-whisper settings for this CPU.")
+    parser.add_argument("dataset", help="directory of name.wav + name.txt, or a manifest.jsonl")
+    parser.add_argument("--sizes", default="tiny,base,small")
+    parser.add_argument("--compute-types", default="int8,int8_float32,float32")
+    parser.add_argument("--threads", default=",".join(str(t) for t in sorted({1, max(1, cores // 2), cores})))
+    parser.add_argument("--beams", default="1,5")
+    parser.add_argument("--wer-tolerance", type=float, default=0.02, help="accept this much WER above the best")
+    parser.add_argument("--max-rss-mb", type=float, default=None)
+    parser.add_argument(
+        "-o", "--output", default=os.environ.get("VOICE_SHELL_STT_PROFILE", "stt_profile.json"), help="profile path"
+    )
+    parser.add_argument("--results", default=None, help="also write every measurement to this JSONL file")
+    args = parser.parse_args(argv)
+
+    samples = load_labelled_set(args.dataset)
+    if not samples:
+        parser.error(f"no labelled WAV files found in {args.dataset}")
+    sizes = args.sizes.split(",")
+    compute_types = args.compute_types.split(",")
+    threads = [int(t) for t in args.threads.split(",")]
+    beams = [int(b) for b in args.beams.split(",")]
+
+    print(f"{len(samples)} labelled files, {cores} cores")
+    print(f"{'size':>8} {'compute':>14} {'thr':>4} {'beam':>5} {'mean s':>8} {'p95 s':>7} {'RTF':>6} {'WER':>7} {'RSS MB':>8}")
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for size, compute_type, thr in itertools.product(sizes, compute_types, threads):
+        with ctx.Pool(1) as pool:
+            try:
+                rows = pool.apply(_run_config, (size, compute_type, thr, beams, samples))
+            except Exception as e:
+                print(f"{size:>8} {compute_type:>14} {thr:>4}  failed: {e}", file=sys.stderr)
+                continue
+        for r in rows:
+            results.append(r)
+            print(
+                f"{r['model_size']:>8} {r['compute_type']:>14} {r['cpu_threads']:>4} {r['beam_size']:>5} "
+                f"{r['latency_s_mean']:>8.3f} {r['latency_s_p95']:>7.3f} {r['rtf'] or 0:>6.3f} "
+                f"{r['wer'] or 0:>7.3f} {r['peak_rss_mb'] or 0:>8.0f}"
+            )
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+    best = pick_best(results, args.wer_tolerance, args.max_rss_mb)
+    if best is None:
+        print("No configuration met the constraints; profile not written.")
+        return 1
+    profile = {
+        "model_size": best["model_size"],
+        "compute_type": best["compute_type"],
+        "cpu_threads": best["cpu_threads"],
+        "beam_size": best["beam_size"],
+        "measured": best,
+        "samples": len(samples),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    print(f"Best: {best['model_size']}/{best['compute_type']} threads={best['cpu_threads']} beam={best['beam_size']} "
+          f"→ {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
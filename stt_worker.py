@@ -0,0 +1,45 @@
+"""Slim entry module for faster-whisper worker processes.
+
+Worker pools use the "spawn" start method (the only one on Windows), which
+re-imports the parent's main script in every child. When that script is
+terminal_gui.py, each worker would run all of voice_shell_tunglish's import-time
+setup (TTS engine, Gemini client, history DB, limiter state, model manager).
+``start_pool`` makes this module the children's main module instead, so a worker
+only imports what decoding needs.
+"""
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+_model = None
+
+
+def init_worker(size, compute_type, cpu_threads):
+    global _model
+    from faster_whisper import WhisperModel
+    _model = WhisperModel(size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads, num_workers=1)
+
+
+def get_model():
+    """The model ``init_worker`` loaded in this worker process."""
+    return _model
+
+
+def start_pool(workers, size, compute_type, cpu_threads):
+    """Start a spawn-context pool of ``workers`` processes, each with one loaded model."""
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(size, compute_type, cpu_threads),
+    )
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        # Every child re-imports whatever __main__ is when it is spawned; the pool
+        # spawns one worker per submit while none is idle, so start them all now
+        for _ in range(workers):
+            pool.submit(int)
+    finally:
+        sys.modules["__main__"] = main
+    return pool
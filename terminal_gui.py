@@ -1,24 +1,31 @@
+import json
 import os
+import queue
 import re
 import shlex
 import subprocess
+import threading
+import time
 from datetime import datetime
 
 from rich.console import Console
 from rich.live import Live
+from rich.markup import escape
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
 # Reuse core pipeline pieces from the existing app
 import voice_shell_tunglish as core
+from turn_trace import TurnTrace
+from keyboard_input import KeyboardReader
 
 console = Console()
 
 
-def exec_in_wsl_capture(command: str, timeout: int = 10):
+def exec_in_wsl_capture(command: str, timeout=None, trace=None):
     """Execute a sanitized, non-interactive command in WSL and return result fields.
-    Returns dict: {returncode, stdout, stderr, updated_cwd or None}
+    Returns dict: {returncode, stdout, stderr, updated_cwd or None, cached_age or None}
     """
     if not command:
         return {"returncode": None, "stdout": "", "stderr": "", "updated_cwd": None}
@@ -43,9 +50,16 @@ def exec_in_wsl_capture(command: str, timeout: int = 10):
             args += ["--user", user]
         args += ["--cd", wsl_cwd, "--", "bash", "-lc", command]
 
-        result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+        backend = core.wsl_backend_key(distro, user)
+        kind, hit = core.lookup_cached_result(command, wsl_cwd, backend, trace)
+        if hit is not None:
+            cached, age = hit
+            return {**cached, "updated_cwd": None, "cached_age": age}
+
+        result = subprocess.run(args, capture_output=True, text=True, timeout=timeout or core.COMMAND_TIMEOUT)
         stdout = (result.stdout or "").strip()
         stderr = (result.stderr or "").strip()
+        core.remember_result(kind, command, wsl_cwd, backend, {"returncode": result.returncode, "stdout": stdout, "stderr": stderr})
 
         updated_cwd = None
         if result.returncode == 0:
@@ -68,6 +82,7 @@ def exec_in_wsl_capture(command: str, timeout: int = 10):
             "stdout": stdout,
             "stderr": stderr,
             "updated_cwd": updated_cwd,
+            "cached_age": None,
         }
     except subprocess.TimeoutExpired:
         return {"returncode": None, "stdout": "", "stderr": "Command timed out.", "updated_cwd": None}
@@ -77,15 +92,49 @@ def exec_in_wsl_capture(command: str, timeout: int = 10):
         return {"returncode": None, "stdout": "", "stderr": f"Error executing command: {e}", "updated_cwd": None}
 
 
-def build_layout(status: str, transcript: str, command: str, output: str, errors: str):
+class JobsPanel:
+    """Rendered on every Live refresh, so job state stays current while the loop listens."""
+
+    def __rich__(self):
+        table = Table.grid(padding=(0, 1))
+        for job in core.job_manager.list()[-4:]:
+            style = {"running": "yellow", "done": "green"}.get(job.state, "red")
+            last = job.log[-1] if job.log else ""
+            table.add_row(f"[{style}]{job.summary()}[/]", f"[dim]{last[:60]}[/]")
+        return Panel(table, title="Jobs", border_style="yellow")
+
+
+class InputFooter:
+    """Live footer showing the mic state and the line being typed."""
+
+    def __init__(self, keyboard=None, listening=None):
+        self.keyboard = keyboard
+        self.listening = listening
+        self.typing = False
+        self.mic = "Starting"
+
+    def __rich__(self):
+        mic = self.mic if self.listening is None or self.listening.is_set() else "Paused"
+        parts = [f"[bold]🎤 {mic}[/]"]
+        if self.typing:
+            parts.append(f"⌨ [bold white]{escape(self.keyboard.buffer)}[/][blink]▌[/]")
+            parts.append("Enter to run, Esc to clear")
+        parts.append("Ctrl+C to quit")
+        return Panel(Text.from_markup("  |  ".join(parts)), border_style="cyan")
+
+
+def build_layout(status: str, transcript: str, command: str, output: str, errors: str, cached_age=None, footer=None):
     from rich.layout import Layout
 
     layout = Layout()
-    layout.split_column(
+    rows = [
         Layout(name="header", size=3),
         Layout(name="body", ratio=1),
-        Layout(name="footer", size=3),
-    )
+    ]
+    if core.job_manager.list():
+        rows.append(Layout(JobsPanel(), name="jobs", size=6))
+    rows.append(Layout(name="footer", size=3))
+    layout.split_column(*rows)
 
     header_text = Text.from_markup(
         f"[bold cyan]AI-Powered Voice Shell[/]  |  [white]Status:[/] [bold]{status}[/]  |  {datetime.now().strftime('%H:%M:%S')}"
@@ -114,87 +163,244 @@ def build_layout(status: str, transcript: str, command: str, output: str, errors
         right_table.add_row(f"[red]{errors}[/]")
 
     body["left"].update(Panel(left_table, title="Request", border_style="magenta"))
-    body["right"].update(Panel(right_table, title="Response", border_style="green"))
+    response_title = "Response" if cached_age is None else f"Response [yellow](cached, {cached_age:.0f}s old)[/]"
+    body["right"].update(Panel(right_table, title=response_title, border_style="green"))
 
     layout["body"].update(body)
 
-    listen_hint = "Speak now" if status.lower().startswith("listening") else "Processing..."
-    footer_text = Text.from_markup(
-        f"[bold]{listen_hint}[/]  |  Press Ctrl+C to quit. Say 'exit' to end the session."
-    )
-    layout["footer"].update(Panel(footer_text, border_style="cyan"))
+    if footer is not None:
+        layout["footer"].update(footer)
+    else:
+        listen_hint = "Speak now" if status.lower().startswith("listening") else "Processing..."
+        footer_text = Text.from_markup(
+            f"[bold]{listen_hint}[/]  |  Press Ctrl+C to quit. Say 'exit' to end the session."
+        )
+        layout["footer"].update(Panel(footer_text, border_style="cyan"))
 
     return layout
 
 
-def run_tui_loop():
-    transcript = ""
-    command = ""
-    output = ""
-    errors = ""
-
-    core.speak("Voice shell started. Say your command.")
-    status = "Listening – Speak now"
-
-    with Live(build_layout(status, transcript, command, output, errors), refresh_per_second=8, console=console) as live:
-        while True:
-            try:
-                status = "Listening – Speak now"
-                live.update(build_layout(status, transcript, command, output, errors))
+def mic_worker(inputs: queue.Queue, listening: threading.Event, turns: list, stop: threading.Event,
+               turn_lock: threading.Lock, footer=None):
+    """Record and transcribe utterances while ``listening`` is set and queue them as voice turns.
 
+    An utterance is dropped if a turn (e.g. a typed one) started while it was being
+    recorded, so speech overlapping a running command is never executed afterwards.
+    The worker clears ``listening`` itself before queueing a voice turn (under
+    ``turn_lock``, which the main loop also holds while starting a turn), so the next
+    recording only starts with a fresh epoch once that turn is over.
+    """
+    while not stop.is_set():
+        if not listening.wait(timeout=0.2):
+            continue
+        epoch = turns[0]
+        trace = TurnTrace("voice")
+        try:
+            if footer is not None:
+                footer.mic = "Speak now"
+            with trace.stage("record"):
                 core.record_voice()
-
-                status = "Transcribing"
-                live.update(build_layout(status, transcript, command, output, errors))
+            if turns[0] != epoch or not listening.is_set():
+                continue
+            if footer is not None:
+                footer.mic = "Transcribing"
+            with trace.stage("stt", core.TRANSCRIBE_PROVIDER):
                 transcript = core.transcribe_audio() or ""
-
-                if not transcript.strip():
+            if not transcript.strip():
+                trace.finish("empty")
+                continue
+            with turn_lock:
+                if turns[0] != epoch:
                     continue
+                listening.clear()
+                inputs.put(("voice", transcript, trace))
+        except Exception as e:
+            trace.finish("error")
+            inputs.put(("error", f"Microphone/STT error: {e}", None))
+            stop.wait(5.0)
 
-                status = "Thinking"
-                live.update(build_layout(status, transcript, command, output, errors))
-                normalized_text = core.tamil_to_tunglish(transcript)
-                command, exit_flag = core.get_command_and_exit(normalized_text)
 
-                if (command or "").strip() in ["", "true", "ok"]:
-                    errors = "No valid shell command generated."
-                    output = ""
-                    continue
+def run_tui_loop():
+    transcript = ""
+    command = ""
+    output = ""
+    errors = ""
+    cached_age = None
+
+    core.start_network_warmup()
+    core.speak("Voice shell started. Say or type your command.")
+    status = "Listening – Speak or type"
+
+    # Voice and typed input feed one queue; `listening` pauses the mic while a turn runs
+    inputs = queue.Queue()
+    listening = threading.Event()
+    stop = threading.Event()
+    turns = [0]
+    turn_lock = threading.Lock()
+
+    def on_typed(line):
+        core.net_warmer.touch()
+        inputs.put(("typed", line, TurnTrace("typed")))
+
+    keyboard = KeyboardReader(on_typed)
+    footer = InputFooter(keyboard, listening)
+    threading.Thread(target=mic_worker, args=(inputs, listening, turns, stop, turn_lock, footer), name="mic", daemon=True).start()
+    if keyboard.start():
+        footer.typing = True
+    listening.set()
 
-                if exit_flag:
-                    status = "Exiting"
-                    live.update(build_layout(status, transcript, command, output, errors))
-                    core.speak("Okay, exiting. Goodbye!")
-                    console.print(Panel("Exit intent detected. Shutting down.", border_style="red"))
+    try:
+        with Live(build_layout(status, transcript, command, output, errors, footer=footer), refresh_per_second=8, console=console) as live:
+            while True:
+                trace = None
+                try:
+                    status = "Listening – Speak or type"
+                    live.update(build_layout(status, transcript, command, output, errors, cached_age, footer))
+                    try:
+                        mode, text, trace = inputs.get(timeout=0.25)
+                    except queue.Empty:
+                        continue
+                    if mode == "error":
+                        errors = text
+                        output = ""
+                        cached_age = None
+                        continue
+
+                    with turn_lock:
+                        listening.clear()
+                        turns[0] += 1
+                    transcript = text if mode == "voice" else f"⌨ {text}"
+                    # Recall phrases are matched before translation, which rewrites
+                    # Tunglish ones ("thirumba pannu") beyond recognition
+                    with trace.stage("recall"):
+                        recall = core.resolve_recall(text)
+                    # Typed instructions skip capture, STT and translation
+                    normalized_text = text
+                    if recall is None:
+                        if mode == "voice":
+                            status = "Thinking"
+                            live.update(build_layout(status, transcript, command, output, errors, cached_age, footer))
+                            with trace.stage("translate"):
+                                normalized_text = core.normalize_instruction(
+                                    text, trace, language_code=core.TRANSCRIPT_LANGUAGE_CODE
+                                )
+                        job_reply = core.handle_job_request(normalized_text)
+                        if job_reply is not None:
+                            spoken, detail = job_reply
+                            output = detail or spoken
+                            errors = ""
+                            cached_age = None
+                            trace.finish("jobs")
+                            core.speak(spoken)
+                            continue
+                        if normalized_text != text:
+                            with trace.stage("recall"):
+                                recall = core.resolve_recall(normalized_text)
+                    if recall is not None and not recall[0]:
+                        output = recall[1]
+                        errors = ""
+                        cached_age = None
+                        trace.finish("recall")
+                        core.speak(recall[1])
+                        continue
+                    if recall is not None:
+                        command, exit_flag = recall[0], False
+                        trace.set(recall=True)
+                    else:
+                        status = "Thinking"
+                        live.update(build_layout(status, transcript, command, output, errors, cached_age, footer))
+                        with trace.stage("command", "gemini"):
+                            command, exit_flag = core.get_command_and_exit(normalized_text)
+
+                    if (command or "").strip() in ["", "true", "ok"]:
+                        errors = "No valid shell command generated."
+                        output = ""
+                        cached_age = None
+                        trace.finish("no_command")
+                        continue
+
+                    if exit_flag:
+                        trace.finish("exit")
+                        status = "Exiting"
+                        live.update(build_layout(status, transcript, command, output, errors, cached_age, footer))
+                        core.speak("Okay, exiting. Goodbye!")
+                        console.print(Panel("Exit intent detected. Shutting down.", border_style="red"))
+                        console.print(Panel(json.dumps(core.session_stats(), indent=2), title="Session stats", border_style="cyan"))
+                        break
+
+                    run_cwd = core.current_wsl_cwd()
+                    job = core.maybe_start_job(command, normalized_text)
+                    if job is not None:
+                        core.record_history(job.command, text, normalized_text, run_cwd, mode=mode)
+                        output = f"Started job {job.id} in the background."
+                        errors = ""
+                        cached_age = None
+                        trace.finish("job_started")
+                        core.speak(output)
+                        continue
+
+                    status = "Executing"
+                    live.update(build_layout(status, transcript, command, output, errors, cached_age, footer))
+                    start = time.perf_counter()
+                    with trace.stage("execute", "wsl"):
+                        res = exec_in_wsl_capture(command, trace=trace)
+                    rc = res.get("returncode")
+                    fixed = None
+                    if core.AUTO_REPAIR and rc not in (None, 0):
+                        status = "Repairing"
+                        live.update(build_layout(status, transcript, command, res.get("stdout", ""), res.get("stderr", ""), None, footer))
+
+                        def run_fix(cmd):
+                            nonlocal res
+                            res = exec_in_wsl_capture(cmd, trace=trace)
+                            return res.get("returncode"), res.get("stderr", "")
+
+                        fixed = core.try_repair(normalized_text, command, res.get("stderr", ""), rc, run_fix, trace)
+                        if fixed.command:
+                            command, rc = fixed.command, fixed.rc
+                    output = res.get("stdout", "") or "<no output>"
+                    errors = res.get("stderr", "")
+                    if fixed is not None and not fixed.ok:
+                        errors = f"{errors}\n(auto-repair stopped: {fixed.reason})".strip()
+                    core.record_history(
+                        command.strip(), text, normalized_text, run_cwd, rc, (time.perf_counter() - start) * 1000.0, mode
+                    )
+                    cached_age = res.get("cached_age")
+                    if fixed is not None and fixed.ok:
+                        trace.finish("repaired", rc=rc)
+                    else:
+                        trace.finish("ok" if rc == 0 else "failed", rc=rc)
+
+                    if rc == 0:
+                        core.speak("Command executed successfully.")
+                    elif rc is None:
+                        core.speak("Command failed.")
+                    else:
+                        core.speak("Command failed.")
+
+                except KeyboardInterrupt:
+                    if trace is not None:
+                        trace.finish("interrupted")
+                    core.speak("Goodbye!")
+                    console.print(Panel("Interrupted by user. Exiting.", border_style="red"))
                     break
-
-                status = "Executing"
-                live.update(build_layout(status, transcript, command, output, errors))
-                res = exec_in_wsl_capture(command)
-                output = res.get("stdout", "") or "<no output>"
-                errors = res.get("stderr", "")
-                rc = res.get("returncode")
-
-                if rc == 0:
-                    core.speak("Command executed successfully.")
-                elif rc is None:
-                    core.speak("Command failed.")
-                else:
-                    core.speak("Command failed.")
-
-                status = "Listening – Speak now"
-                live.update(build_layout(status, transcript, command, output, errors))
-
-            except KeyboardInterrupt:
-                core.speak("Goodbye!")
-                console.print(Panel("Interrupted by user. Exiting.", border_style="red"))
-                break
-            except Exception as e:
-                errors = f"Unexpected error: {e}"
-                output = ""
-                status = "Error"
-                live.update(build_layout(status, transcript, command, output, errors))
-                core.speak("Something went wrong, please try again.")
+                except Exception as e:
+                    if trace is not None:
+                        trace.finish("error")
+                    errors = f"Unexpected error: {e}"
+                    output = ""
+                    cached_age = None
+                    status = "Error"
+                    live.update(build_layout(status, transcript, command, output, errors, cached_age, footer))
+                    core.speak("Something went wrong, please try again.")
+                finally:
+                    # Only a finished turn resumes the mic; idle polls must not undo
+                    # the worker pausing it for a voice turn that is still queued
+                    if trace is not None:
+                        listening.set()
+    finally:
+        stop.set()
+        keyboard.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+import pytest
+
+from command_cache import CommandResultCache, classify
+
+
+@pytest.mark.parametrize("command", [
+    "ls -la",
+    "git status",
+    "git branch",
+    "git branch -a",
+    "git remote -v",
+    "git diff HEAD~1",
+    "sort names.txt",
+    "sed -n 1,5p file.txt",
+    "uniq -c in.txt",
+    "find . -name '*.py'",
+    "ls 2>/dev/null",
+    "git diff -u HEAD~1",
+    "git log -c",
+    "git branch -a",
+    "grep -r TODO . 2>&1",
+])
+def test_read_only(command):
+    assert classify(command) == "read_only"
+
+
+@pytest.mark.parametrize("command", [
+    "git branch feature",
+    "git remote add origin https://example.com/repo.git",
+    "git diff --output=patch.txt",
+    "git diff --output patch.txt",
+    "sort --output=out.txt in.txt",
+    "sort -o out.txt in.txt",
+    "sort -oout.txt in.txt",
+    "sed --in-place=.bak s/a/b/ f.txt",
+    "sed -i.bak s/a/b/ f.txt",
+    "uniq in.txt out.txt",
+    "uniq -c in.txt out.txt",
+    "find . -name '*.log' -fprint0 out",
+    "find . -delete",
+    "ls > listing.txt",
+    "ls >| out.txt",
+    "ls 2>| err.txt",
+    "ls <(rm -rf x)",
+    "diff a.txt >(tee copy.txt)",
+    "git branch --set-upstream-to=origin/main",
+    "git branch -u origin/main",
+    "git branch --unset-upstream",
+    "echo $(rm -rf x)",
+    "touch a",
+])
+def test_mutating(command):
+    assert classify(command) == "mutating"
+
+
+def test_navigation():
+    assert classify("cd /tmp") == "navigation"
+    assert classify("cd /tmp && ls") == "navigation"
+
+
+def test_cache_roundtrip_and_invalidate(tmp_path):
+    cache = CommandResultCache(max_entries=4, max_bytes=10_000, ttl=60)
+    result = {"returncode": 0, "stdout": "a\nb", "stderr": ""}
+    cache.put("ls", str(tmp_path), "wsl", result)
+    hit = cache.get("ls", str(tmp_path), "wsl")
+    assert hit is not None and hit[0]["stdout"] == "a\nb"
+    cache.invalidate_all()
+    assert cache.get("ls", str(tmp_path), "wsl") is None
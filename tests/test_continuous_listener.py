@@ -0,0 +1,52 @@
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from continuous_listener import ContinuousListener
+
+LOUD = np.full((480, 1), 8000, dtype=np.int16)
+QUIET = np.zeros((480, 1), dtype=np.int16)
+
+
+@pytest.fixture
+def listener(monkeypatch):
+    written = []
+    monkeypatch.setitem(sys.modules, "wavio", types.SimpleNamespace(write=lambda f, data, fs, sampwidth: written.append(data)))
+    lst = ContinuousListener(silence_ms=90, tail_ms=30, preroll_ms=60)
+    monkeypatch.setattr(lst, "start", lambda: None)
+    lst.written = written
+    return lst
+
+
+def feed(listener, *frames):
+    for frame in frames:
+        listener._callback(frame, len(frame), None, None)
+
+
+def test_speech_while_nobody_listens_is_not_queued(listener):
+    feed(listener, *[LOUD] * 20, *[QUIET] * 10)
+    assert listener._frames.empty()
+
+
+def test_queue_is_bounded(listener):
+    listener._waiting.set()
+    feed(listener, *[LOUD] * (listener.max_frames + 50))
+    assert listener._frames.qsize() <= listener._frames.maxsize
+    assert listener.dropped_frames > 0
+
+
+def test_captures_only_speech_after_waiting_starts(listener):
+    feed(listener, *[LOUD] * 5)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(listener.next_utterance(timeout=2.0)))
+    thread.start()
+    assert listener._waiting.wait(1.0) or not thread.is_alive()
+    feed(listener, *[QUIET] * 3, *[LOUD] * 4, *[QUIET] * 6)
+    thread.join(2.0)
+    # One quiet pre-roll frame, four speech frames and one tail frame
+    assert result == [6 * 480]
+    assert not listener._waiting.is_set()
+    assert listener.stats()["utterances"] == 1
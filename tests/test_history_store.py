@@ -0,0 +1,30 @@
+import pytest
+
+from history_store import HistoryStore, parse_recall
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("run that again", ("again", None)),
+    ("Thirumba pannu.", ("again", None)),
+    ("thirumba run pannu", ("again", None)),
+    ("repeat the last command in the other folder", ("again_other_dir", None)),
+    ("run the last git command", ("prefix", "git")),
+    ("save the last two commands as deploy check", ("save_macro", ("deploy check", 2))),
+    ("list files in docs", None),
+])
+def test_parse_recall(text, expected):
+    assert parse_recall(text) == expected
+
+
+def test_history_and_macros(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.record("git status", instruction="show git status", cwd="/a", rc=0)
+    store.record("ls -la", instruction="list all files", cwd="/b", rc=0)
+    assert store.last()[0]["command"] == "ls -la"
+    assert store.previous_cwd("/b") == "/a"
+    assert [r["command"] for r in store.search_prefix("git")] == ["git status"]
+    assert store.search_fuzzy("list all the files")[0]["command"] == "ls -la"
+    store.define_macro("Deploy Check", ["git status", "npm test"])
+    assert store.match_macro("run deploy check") == "deploy check"
+    assert store.get_macro("deploy check") == ["git status", "npm test"]
+    store.close()
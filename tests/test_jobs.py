@@ -0,0 +1,54 @@
+import sys
+
+import pytest
+
+from jobs import JobManager, parse_job_request, wants_background
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("job status", ("status", None)),
+    ("show jobs", ("status", None)),
+    ("list all the background jobs", ("status", None)),
+    ("status of the jobs", ("status", None)),
+    ("what's running in the background?", ("status", None)),
+    ("job 2", ("status", 2)),
+    ("show output of job 2", ("output", 2)),
+    ("tail the background job log", ("output", None)),
+    ("cancel job 3", ("cancel", 3)),
+    ("kill the background job", ("cancel", None)),
+])
+def test_job_requests(text, expected):
+    assert parse_job_request(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "stop the cron job",
+    "list all tasks in todo.txt",
+    "tail the task log file",
+    "show the cron job log",
+    "what is running on port 8080",
+    "run the build as a background job",
+])
+def test_shell_instructions_are_not_job_requests(text):
+    assert parse_job_request(text) is None
+
+
+def test_wants_background():
+    assert wants_background("make all &") == (True, "make all")
+    assert wants_background("npm install")[0]
+    assert wants_background("ls -la") == (False, "ls -la")
+
+
+def test_cancel_without_id_never_kills():
+    manager = JobManager()
+    job = manager.start([sys.executable, "-c", "import time; time.sleep(30)"], "sleep", "/tmp")
+    try:
+        spoken, detail = manager.handle_request("cancel", None)
+        assert "Which job" in spoken and str(job.id) in detail
+        assert job.state == "running"
+        spoken, _ = manager.handle_request("cancel", job.id)
+        assert spoken == f"Cancelled job {job.id}."
+        assert job.state == "cancelled"
+    finally:
+        if job.proc.poll() is None:
+            job.proc.kill()
@@ -0,0 +1,21 @@
+import pytest
+
+from language_detect import route_instruction
+
+
+@pytest.mark.parametrize("text, route", [
+    ("list all files in the current folder", "english"),
+    ("Sample folder create pannu", "local"),
+    ("கோப்புகளை காட்டு", "gemini"),
+])
+def test_routes_by_detection(text, route):
+    assert route_instruction(text)[0] == route
+
+
+@pytest.mark.parametrize("code", ["en-IN", "en", "EN-us"])
+def test_english_language_code_short_circuits(code):
+    assert route_instruction(" Sample folder create pannu ", code) == ("english", "Sample folder create pannu")
+
+
+def test_other_language_codes_still_detect():
+    assert route_instruction("Sample folder create pannu", "ta-IN")[0] == "local"
@@ -0,0 +1,190 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+from llm_client import CircuitBreaker, CircuitOpenError, LLMClient
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class FakeLLM:
+    """Local HTTP stand-in for the provider: per-model scripted (status, delay) replies."""
+
+    def __init__(self):
+        self.scripts = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                model = self.path.rsplit("/", 1)[-1]
+                prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["prompt"]
+                with fake._lock:
+                    fake.requests[model] = fake.requests.get(model, 0) + 1
+                    script = fake.scripts.get(model) or []
+                    status, delay = script.pop(0) if len(script) > 1 else (script[0] if script else (200, 0.0))
+                time.sleep(delay)
+                body = json.dumps({"text": f"{model}: {prompt}"}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass  # the client gave up on a slow reply
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.block_on_close = False
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def script(self, model, *replies):
+        self.scripts[model] = list(replies)
+
+    def generate(self, model_name, prompt, timeout):
+        req = urllib.request.Request(
+            f"{self.url}/models/{model_name}", data=json.dumps({"prompt": prompt}).encode(), method="POST"
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return json.loads(resp.read())["text"]
+        except urllib.error.HTTPError as e:
+            if e.code == 503:
+                raise ServiceUnavailable("503 from fake provider") from None
+            raise ValueError(f"{e.code} from fake provider") from None
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake():
+    server = FakeLLM()
+    yield server
+    server.close()
+
+
+def make_client(fake, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("backoff_max", 0.02)
+    return LLMClient(fake.generate, "primary", **kwargs)
+
+
+def test_hedge_wins_when_primary_is_slow(fake):
+    fake.script("primary", (200, 1.0))
+    client = make_client(fake, fallback_model="fallback", hedge_delay=0.05, timeout=3.0)
+    start = time.monotonic()
+    assert client.generate_text("ls") == "fallback: ls"
+    assert time.monotonic() - start < 0.9
+    snap = client.metrics.snapshot()
+    assert (snap["hedges"], snap["hedge_wins"], snap["successes"]) == (1, 1, 1)
+
+
+def test_retries_transient_errors_with_full_jitter(fake, monkeypatch):
+    fake.script("primary", (503, 0.0), (503, 0.0), (200, 0.0))
+    bounds = []
+    real_uniform = random.uniform
+
+    def uniform(a, b):
+        bounds.append((a, b))
+        return real_uniform(a, b)
+
+    monkeypatch.setattr(llm_client.random, "uniform", uniform)
+    client = make_client(fake, max_attempts=3, backoff_base=0.01, backoff_max=0.015)
+    assert client.generate_text("pwd") == "primary: pwd"
+    assert bounds == [(0, 0.01), (0, 0.015)]
+    snap = client.metrics.snapshot()
+    assert (snap["calls"], snap["failures"], snap["retries"]) == (3, 2, 2)
+    assert snap["errors"] == {"ServiceUnavailable": 2}
+
+
+def test_deadline_bounds_a_hung_provider(fake):
+    fake.script("primary", (200, 2.0))
+    client = make_client(fake, timeout=0.3, max_attempts=1)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        client.generate_text("date")
+    assert time.monotonic() - start < 1.0
+
+
+def test_breaker_opens_then_half_opens(fake):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0, clock=lambda: now[0])
+    fake.script("primary", (503, 0.0))
+    client = make_client(fake, max_attempts=1, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailable):
+            client.generate_text("whoami")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.generate_text("whoami")
+    assert fake.requests["primary"] == 2
+
+    now[0] = 31.0
+    assert breaker.state == "half-open"
+    fake.script("primary", (200, 0.0))
+    assert client.generate_text("whoami") == "primary: whoami"
+    assert breaker.state == "closed"
+    assert client.metrics.snapshot()["breaker_rejections"] == 1
+
+
+def test_rejected_requests_do_not_open_the_breaker(fake):
+    breaker = CircuitBreaker(failure_threshold=1)
+    fake.script("primary", (400, 0.0))
+    client = make_client(fake, max_attempts=3, breaker=breaker)
+    with pytest.raises(ValueError):
+        client.generate_text("bad prompt")
+    assert breaker.state == "closed"
+    snap = client.metrics.snapshot()
+    assert (snap["calls"], snap["retries"], snap["errors"]) == (1, 0, {"ValueError": 1})
+
+
+def test_gemini_ping_reuses_the_generating_model():
+    created, used = [], []
+
+    class FakeModel:
+        def __init__(self, name):
+            created.append(name)
+
+        def generate_content(self, prompt, request_options):
+            used.append(("generate", id(self)))
+            return type("Response", (), {"text": " ls \n"})()
+
+        def count_tokens(self, text, request_options):
+            used.append(("count_tokens", id(self)))
+
+    generate = llm_client.make_gemini_generate(type("genai", (), {"GenerativeModel": FakeModel}))
+    generate.ping("models/m")
+    assert generate("models/m", "list files", 5.0) == "ls"
+    assert created == ["models/m"]
+    assert used[0][1] == used[1][1]
+
+
+def test_open_breaker_takes_no_rate_limit_budget(fake):
+    from rate_limiter import LLMRateLimiter
+
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0, clock=lambda: now[0])
+    limiter = LLMRateLimiter(requests_per_min=10)
+    fake.script("primary", (503, 0.0))
+    client = make_client(fake, max_attempts=1, breaker=breaker, limiter=limiter)
+    with pytest.raises(ServiceUnavailable):
+        client.generate_text("uptime")
+    for _ in range(5):
+        with pytest.raises(CircuitOpenError):
+            client.generate_text("uptime")
+    assert limiter.stats()["granted"] == 1
@@ -0,0 +1,110 @@
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+import time
+
+import pytest
+
+import net_warmup
+from net_warmup import ConnectionWarmer, dns_cache_stats, install_dns_cache, probe
+
+
+@pytest.fixture
+def self_signed(tmp_path):
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl CLI not available")
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost", "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return str(cert), str(key)
+
+
+@pytest.fixture
+def tls_server(self_signed):
+    cert, key = self_signed
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    listener = socket.create_server(("127.0.0.1", 0))
+    stop = threading.Event()
+
+    def serve():
+        listener.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            try:
+                with ctx.wrap_socket(conn, server_side=True):
+                    pass
+            except (ssl.SSLError, OSError):
+                conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield listener.getsockname()[1], cert
+    stop.set()
+    thread.join(1.0)
+    listener.close()
+
+
+def test_probe_times_each_handshake_phase(tls_server):
+    port, cert = tls_server
+    timings = probe("localhost", port, timeout=2.0, ssl_context=ssl.create_default_context(cafile=cert))
+    assert set(timings) == {"dns_ms", "tcp_ms", "tls_ms"}
+    assert all(v >= 0.0 for v in timings.values())
+    assert timings["tls_ms"] > 0.0
+
+
+def test_probe_rejects_an_untrusted_cert(tls_server):
+    port, _ = tls_server
+    with pytest.raises(ssl.SSLError):
+        probe("localhost", port, timeout=2.0)
+
+
+def test_dns_cache_serves_stale_answer_on_gaierror(monkeypatch):
+    # Undo the process-wide patch and start from an empty cache
+    monkeypatch.setattr(socket, "getaddrinfo", socket.getaddrinfo)
+    monkeypatch.setattr(net_warmup, "_dns_cache", {})
+    monkeypatch.setattr(net_warmup, "_dns_stats", {"hits": 0, "misses": 0, "stale_served": 0})
+    answer = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.7", 443))]
+    calls = []
+
+    def flaky_resolver(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        return answer
+
+    monkeypatch.setattr(net_warmup, "_orig_getaddrinfo", flaky_resolver)
+    install_dns_cache(ttl=0.0)
+    assert socket.getaddrinfo("api.example.test", 443) == answer
+    assert socket.getaddrinfo("api.example.test", 443) == answer
+    with pytest.raises(socket.gaierror):
+        socket.getaddrinfo("other.example.test", 443)
+    stats = dns_cache_stats()
+    assert (stats["misses"], stats["stale_served"], stats["entries"]) == (3, 1, 1)
+
+
+def test_pings_stop_after_active_window():
+    pings = []
+    warmer = ConnectionWarmer(interval=0.02, active_window=0.15)
+    warmer.add_ping("fake", lambda: pings.append(time.monotonic()))
+    warmer.start()
+    try:
+        time.sleep(0.4)
+        idle_count = len(pings)
+        assert idle_count >= 3
+        time.sleep(0.2)
+        assert len(pings) == idle_count
+        warmer.touch()
+        time.sleep(0.1)
+        assert len(pings) > idle_count
+        assert warmer.stats()["request"]["fake"]["last_ms"] >= 0.0
+    finally:
+        warmer.stop()
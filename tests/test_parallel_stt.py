@@ -0,0 +1,55 @@
+import numpy as np
+
+import parallel_stt
+from parallel_stt import ParallelTranscriber, split_on_pauses
+
+
+class FakePool:
+    """Runs chunks inline and records the language each one was decoded with."""
+
+    def __init__(self):
+        self.languages = []
+
+    def submit(self, fn, index, samples, language, beam_size):
+        self.languages.append(language)
+        result = (index, f"part{index}", language or "ta")
+
+        class Done:
+            def result(self):
+                return result
+
+        return Done()
+
+
+def write_dictation(path, fs=16000):
+    import wave
+
+    speech, pause = np.full(fs * 9, 0.3), np.zeros(fs // 2)
+    audio = np.concatenate([speech, pause, speech, pause, speech])
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(fs)
+        w.writeframes((audio * 32767).astype(np.int16).tobytes())
+
+
+def test_split_on_pauses_cuts_at_pause_midpoints():
+    fs = 16000
+    audio = np.concatenate([np.full(fs * 9, 0.3), np.zeros(fs // 2), np.full(fs * 9, 0.3)])
+    chunks = split_on_pauses(audio, fs)
+    assert len(chunks) == 2
+    assert chunks[0][1] == chunks[1][0]
+    assert fs * 9 < chunks[0][1] < fs * 9 + fs // 2
+
+
+def test_language_detected_once_and_shared(tmp_path, monkeypatch):
+    wav = tmp_path / "dictation.wav"
+    write_dictation(wav)
+    pool = FakePool()
+    monkeypatch.setattr(parallel_stt.stt_worker, "start_pool", lambda *args: pool)
+    pt = ParallelTranscriber(workers=2, idle_timeout=0)
+    assert pt.transcribe(str(wav)) == "part0 part1 part2"
+    assert pool.languages == [None, "ta", "ta"]
+    pool.languages.clear()
+    pt.transcribe(str(wav), language="en")
+    assert pool.languages == ["en", "en", "en"]
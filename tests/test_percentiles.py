@@ -0,0 +1,13 @@
+from percentiles import percentile
+
+
+def test_percentile_is_nearest_rank_on_unsorted_input():
+    values = [50, 10, 40, 20, 30]
+    assert percentile(values, 0) == 10
+    assert percentile(values, 50) == 30
+    assert percentile(values, 95) == 50
+    assert percentile(values, 100) == 50
+
+
+def test_percentile_of_nothing_is_none():
+    assert percentile([], 50) is None
@@ -0,0 +1,30 @@
+import json
+
+from perf_report import LatencyHistogram, TraceAggregator
+
+
+def test_tied_slow_turns_do_not_break_the_heap():
+    agg = TraceAggregator(top_n=2)
+    agg.add({"outcome": "ok", "response_ms": 100.0, "stages": {"a": 1}})
+    agg.add({"outcome": "ok", "response_ms": 100.0, "stages": {"a": 2}})
+    agg.add({"outcome": "ok", "response_ms": 100.0, "mode": "typed", "stages": {"a": 3}})
+    agg.add({"outcome": "ok", "response_ms": 250.0, "stages": {"a": 4}})
+    slowest = agg.slowest()
+    assert [ms for ms, *_ in slowest] == [250.0, 100.0]
+    assert slowest[0][4] == {"a": 4}
+
+
+def test_histogram_percentiles_within_bucket_error():
+    hist = LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.add(ms)
+    assert abs(hist.percentile(50) - 500) / 500 < 0.03
+    assert hist.percentile(100) == 1000
+
+
+def test_add_file_skips_bad_lines(tmp_path):
+    path = tmp_path / "turns.jsonl"
+    path.write_text(json.dumps({"outcome": "ok", "response_ms": 5.0, "ts": 1.0}) + "\nnot json\n\n")
+    agg = TraceAggregator()
+    agg.add_file(str(path))
+    assert (agg.turns, agg.bad_lines) == (1, 1)
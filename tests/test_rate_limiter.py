@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from llm_client import LLMClient
+from rate_limiter import InFlightCoalescer, LLMRateLimiter
+
+
+def test_low_priority_leaves_the_reserve(tmp_path):
+    # Two limiters on one state dir stand in for a batch script and the TUI
+    batch = LLMRateLimiter(requests_per_min=10, state_dir=str(tmp_path), key="k", reserve_fraction=0.3)
+    tui = LLMRateLimiter(requests_per_min=10, state_dir=str(tmp_path), key="k", reserve_fraction=0.3)
+    taken = 0
+    while batch.try_acquire(100, priority=10):
+        taken += 1
+    assert taken == 7
+    assert tui.try_acquire(100, priority=0)
+
+
+def test_low_priority_acquire_times_out_on_the_reserve(tmp_path):
+    limiter = LLMRateLimiter(requests_per_min=5, state_dir=str(tmp_path), reserve_fraction=0.4)
+    for _ in range(3):
+        limiter.acquire(10, priority=5, timeout=1.0)
+    with pytest.raises(TimeoutError):
+        limiter.acquire(10, priority=5, timeout=0.05)
+    limiter.acquire(10, priority=0, timeout=0.05)
+    assert limiter.stats()["timeouts"] == 1
+
+
+def test_token_reserve():
+    limiter = LLMRateLimiter(requests_per_min=100, tokens_per_min=1000, reserve_fraction=0.5)
+    assert limiter.try_acquire(400, priority=1)
+    assert not limiter.try_acquire(400, priority=1)
+    assert limiter.try_acquire(400, priority=0)
+
+
+def test_priority_zero_is_served_before_queued_batch_caller():
+    limiter = LLMRateLimiter(requests_per_min=600, reserve_fraction=0.0)
+    while limiter.try_acquire(1):
+        pass
+    order = []
+    batch = threading.Thread(target=lambda: (limiter.acquire(1, priority=5, timeout=2.0), order.append("batch")))
+    batch.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=lambda: (limiter.acquire(1, priority=0, timeout=2.0), order.append("interactive")))
+    interactive.start()
+    batch.join(3.0)
+    interactive.join(3.0)
+    assert order == ["interactive", "batch"]
+
+
+def test_identical_prompts_in_flight_share_one_call():
+    calls = []
+
+    def generate(model, prompt, timeout):
+        calls.append(prompt)
+        time.sleep(0.2)
+        return "ls -la"
+
+    client = LLMClient(generate, "primary")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.generate_text("list files"))) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(2.0)
+    assert results == ["ls -la", "ls -la"]
+    assert len(calls) == 1
+    assert client.coalescer.coalesced == 1
+
+
+def test_coalescing_respects_priority_and_follower_deadline():
+    coalescer = InFlightCoalescer()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: coalescer.run("k", lambda: release.wait(2.0)))
+    leader.start()
+    time.sleep(0.02)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        coalescer.run("k", lambda: None, timeout=0.1)
+    assert time.monotonic() - start < 1.0
+    release.set()
+    leader.join(2.0)
+
+    seen = []
+    client = LLMClient(lambda m, p, t: (seen.append(p), time.sleep(0.1))[0] or "ok", "primary")
+    threads = [threading.Thread(target=client.generate_text, args=("pwd",), kwargs={"priority": prio}) for prio in (0, 10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(2.0)
+    assert len(seen) == 2
+    assert client.coalescer.coalesced == 0
@@ -0,0 +1,45 @@
+import json
+
+from repair import parse_repair, repair_command, simulate
+
+
+def fixed_llm(*proposals):
+    replies = iter(proposals)
+    return lambda prompt, timeout: json.dumps({"command": next(replies), "give_up": False})
+
+
+def test_repair_fixes_from_stderr():
+    runs = []
+
+    def execute(command):
+        runs.append(command)
+        return (0, "") if command == "mkdir -p a/b" else (1, "No such file or directory")
+
+    result = repair_command("make a/b", "mkdir a/b", "No such file or directory", 1,
+                            fixed_llm("mkdir -p a/b"), execute)
+    assert (result.ok, result.reason, result.attempts, runs) == (True, "fixed", 1, ["mkdir -p a/b"])
+
+
+def test_repair_stops_on_repeat_give_up_and_unsafe():
+    fail = lambda command: (1, "error")
+    assert repair_command("x", "ls doc", "err", 2, fixed_llm("ls doc"), fail).reason == "repeated"
+    give_up = lambda prompt, timeout: '{"command": "", "give_up": true}'
+    assert repair_command("x", "ls doc", "err", 2, give_up, fail).reason == "gave_up"
+    unsafe = repair_command("x", "ls doc", "err", 2, fixed_llm("vim doc"), fail, sanitize=lambda c: "")
+    assert unsafe.reason == "unsafe"
+    assert repair_command("x", "a", "err", 1, fixed_llm("b", "c", "d"), fail, max_attempts=2).reason == "attempts"
+
+
+def test_parse_repair():
+    assert parse_repair('Sure: {"command": "`ls docs`", "give_up": false}') == "ls docs"
+    assert parse_repair('{"command": "ls", "give_up": "true"}') == ""
+    assert parse_repair("no json") == ""
+
+
+def test_simulation_is_deterministic_and_repair_helps():
+    first, second = simulate(trials=200, seed=3), simulate(trials=200, seed=3)
+    assert first == second
+    without, with_repair = first["without_repair"], first["with_repair"]
+    assert without["trials"] == with_repair["trials"] == 200
+    assert with_repair["successes"] >= without["successes"]
+    assert sum(with_repair["times"]) / len(with_repair["times"]) < sum(without["times"]) / len(without["times"])
@@ -0,0 +1,68 @@
+import pytest
+
+import stt_models
+from stt_models import WhisperModelManager, model_family
+
+
+@pytest.fixture(autouse=True)
+def plenty_of_memory(monkeypatch):
+    monkeypatch.setattr(stt_models, "available_memory_mb", lambda: 64_000.0)
+
+
+@pytest.mark.parametrize("size, family", [
+    ("small", "small"),
+    ("small.en", "small"),
+    ("tiny.en", "tiny"),
+    ("large-v2", "large-v3"),
+    ("distil-large-v3", "large-v3"),
+    ("distil-medium.en", "medium"),
+    ("Systran/faster-whisper-small", None),
+])
+def test_model_family(size, family):
+    assert model_family(size) == family
+
+
+@pytest.mark.parametrize("size", ["small.en", "tiny.en", "large-v2", "distil-large-v3", "/models/custom"])
+def test_configured_size_kept_without_pressure(size):
+    manager = WhisperModelManager(lambda s, c: s, size=size, memory_budget_mb=0)
+    assert manager.choose_size() == size
+    with manager.use() as model:
+        assert model == size
+    assert manager.downgrades == 0
+
+
+def test_budget_downgrades_within_family_order():
+    # int8 estimates: base ~100 MB, small ~330 MB, large ~2100 MB
+    assert WhisperModelManager(None, size="large-v2", memory_budget_mb=400).choose_size() == "small"
+    assert WhisperModelManager(None, size="small.en", memory_budget_mb=200).choose_size() == "base.en"
+    manager = WhisperModelManager(lambda s, c: s, size="medium", memory_budget_mb=200)
+    with manager.use() as model:
+        assert model == "base"
+    assert manager.downgrades == 1
+
+
+def test_low_free_memory_downgrades(monkeypatch):
+    monkeypatch.setattr(stt_models, "available_memory_mb", lambda: 100.0)
+    assert WhisperModelManager(None, size="small").choose_size() == "tiny"
+
+
+class FakePool:
+    def stats(self):
+        return {"workers": 2, "running": True}
+
+
+def test_pool_drops_workers_before_shrinking_the_model():
+    # int8 small ~330 MB + 120 MB worker overhead per worker
+    manager = WhisperModelManager(None, size="small", memory_budget_mb=1400)
+    assert manager.plan_pool(4) == ("small", 3)
+    assert WhisperModelManager(None, size="small", memory_budget_mb=500).plan_pool(4) == ("base", 2)
+    assert WhisperModelManager(None, size="small", memory_budget_mb=100).plan_pool(4)[1] == 1
+
+
+def test_pool_shares_budget_with_loaded_model():
+    manager = WhisperModelManager(lambda s, c: s, size="small", memory_budget_mb=1300)
+    with manager.use():
+        pass
+    assert manager.plan_pool(4) == ("small", 2)
+    manager.attach_pool(FakePool())
+    assert manager.stats()["parallel"] == {"workers": 2, "running": True}
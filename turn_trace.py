@@ -0,0 +1,83 @@
+"""Per-turn timing and outcome traces.
+
+Each voice/typed turn appends one JSON line to a monthly file under
+``VOICE_SHELL_TRACE_DIR`` (default ``traces/``), e.g. ``traces/turns-2026-10.jsonl``::
+
+    {"ts": 1760870000.1, "mode": "voice", "outcome": "ok", "rc": 0,
+     "stages": {"record": 2310.4, "stt": 812.0, "translate": 640.2, ...},
+     "providers": {"stt": "sarvam", "translate": "gemini", ...},
+     "errors": {}, "cache": {"result": "miss"}, "total_ms": 4870.1, "response_ms": 2559.7}
+
+``response_ms`` excludes the ``record`` stage (time spent waiting for the user).
+``generate_report.py --perf`` aggregates these files.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_ENABLED = os.environ.get("VOICE_SHELL_TRACE", "1").strip() != "0"
+TRACE_DIR = os.environ.get("VOICE_SHELL_TRACE_DIR", "traces").strip()
+
+_write_lock = threading.Lock()
+
+
+def trace_path(ts=None):
+    return os.path.join(TRACE_DIR, time.strftime("turns-%Y-%m.jsonl", time.localtime(ts)))
+
+
+class TurnTrace:
+    def __init__(self, mode="voice"):
+        self.record = {
+            "ts": time.time(),
+            "mode": mode,
+            "outcome": None,
+            "stages": {},
+            "providers": {},
+            "errors": {},
+            "cache": {},
+        }
+        self._t0 = time.perf_counter()
+        self._done = False
+
+    @contextmanager
+    def stage(self, name, provider=None):
+        start = time.perf_counter()
+        if provider:
+            self.record["providers"][name] = provider
+        try:
+            yield
+        except Exception as e:
+            self.record["errors"][name] = type(e).__name__
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000.0
+            self.record["stages"][name] = round(self.record["stages"].get(name, 0.0) + elapsed, 1)
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+    def cache(self, name, hit):
+        self.record["cache"][name] = "hit" if hit else "miss"
+
+    def finish(self, outcome, **fields):
+        if self._done:
+            return
+        self._done = True
+        self.record.update(fields)
+        self.record["outcome"] = outcome
+        total = (time.perf_counter() - self._t0) * 1000.0
+        self.record["total_ms"] = round(total, 1)
+        self.record["response_ms"] = round(total - self.record["stages"].get("record", 0.0), 1)
+        if not TRACE_ENABLED:
+            return
+        try:
+            path = trace_path(self.record["ts"])
+            line = json.dumps(self.record, ensure_ascii=False)
+            with _write_lock:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            print("⚠️ Could not write turn trace:", e)
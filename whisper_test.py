@@ -1,4 +1,4 @@
-import whisper
+from faster_whisper import WhisperModel
 import sounddevice as sd
 import numpy as np
 import wavio
@@ -14,10 +14,10 @@ sd.wait()
 wavio.write("input.wav", recording, fs, sampwidth=2)
 print("✅ Audio saved as input.wav")
 
-# Load Whisper model
-model = whisper.load_model("small")  # options: tiny, base, small, medium, large
+# Load Whisper model (int8 keeps it small and fast on CPU)
+model = WhisperModel("small", device="cpu", compute_type="int8")  # options: tiny, base, small, medium, large
 
 # Transcribe
 print("🧠 Transcribing...")
-result = model.transcribe("input.wav")
-print("🗣️ You said:", result["text"])
+segments, info = model.transcribe("input.wav")
+print("🗣️ You said:", " ".join(s.text.strip() for s in segments))